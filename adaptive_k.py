@@ -0,0 +1,81 @@
+"""
+Adaptive k
+Score-aware chunk selection: retrieval fetches up to a server-side maximum,
+then keeps chunks until relevance drops below a cutoff or falls off a score
+gap, so prompts carry only useful context whatever k the client sends
+"""
+
+import os
+from collections import Counter
+from typing import List, Optional, Tuple
+
+# =======================
+# Configuration
+# =======================
+ADAPTIVE_K_ENABLED = os.getenv("ADAPTIVE_K_ENABLED", "true").lower() == "true"
+RETRIEVAL_MAX_K = int(os.getenv("RETRIEVAL_MAX_K", "6"))  # hard cap on chunks per question
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.35"))  # cosine similarity
+RETRIEVAL_SCORE_GAP = float(os.getenv("RETRIEVAL_SCORE_GAP", "0.1"))  # drop below this vs the previous chunk ends the list
+
+def clamp_k(k) -> int:
+    """Client-supplied k as an int in [1, RETRIEVAL_MAX_K]"""
+    try:
+        k = int(k)
+    except (TypeError, ValueError):
+        k = 1
+    return max(1, min(k, RETRIEVAL_MAX_K))
+
+def search_depth(k: int) -> int:
+    """How many candidates to retrieve for a (clamped) k"""
+    return RETRIEVAL_MAX_K if ADAPTIVE_K_ENABLED else k
+
+# =======================
+# Selection
+# =======================
+def select_chunks(docs: list, scores: List[Optional[float]], min_k: int = 1) -> Tuple[list, list]:
+    """
+    Keep the ranked chunks worth sending to the LLM
+    The first min_k are always kept; after that a chunk must score at least
+    RETRIEVAL_MIN_SCORE and within RETRIEVAL_SCORE_GAP of the last scored chunk.
+    A chunk without a cosine score (keyword-only hit the vectorstore could not score)
+    counts as failing the cutoff, so unscored hits never pad the prompt.
+    """
+    if not ADAPTIVE_K_ENABLED:
+        return docs[:min_k], scores[:min_k]
+
+    kept_docs, kept_scores = [], []
+    previous = None
+    for doc, score in zip(docs[:RETRIEVAL_MAX_K], scores[:RETRIEVAL_MAX_K]):
+        if len(kept_docs) >= min_k:
+            if score is None or score < RETRIEVAL_MIN_SCORE:
+                break
+            if previous is not None and previous - score > RETRIEVAL_SCORE_GAP:
+                break
+        kept_docs.append(doc)
+        kept_scores.append(score)
+        if score is not None:
+            previous = score
+    return kept_docs, kept_scores
+
+# =======================
+# Metrics
+# =======================
+class AdaptiveKStats:
+    """Distribution of the chosen k"""
+
+    def __init__(self):
+        self.chosen = Counter()
+
+    def record(self, k: int):
+        self.chosen[k] += 1
+
+    def snapshot(self) -> dict:
+        total = sum(self.chosen.values())
+        return {
+            "enabled": ADAPTIVE_K_ENABLED,
+            "max_k": RETRIEVAL_MAX_K,
+            "min_score": RETRIEVAL_MIN_SCORE,
+            "score_gap": RETRIEVAL_SCORE_GAP,
+            "avg_k": round(sum(k * n for k, n in self.chosen.items()) / total, 2) if total else None,
+            "chosen_k": dict(sorted(self.chosen.items())),
+        }
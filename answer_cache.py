@@ -0,0 +1,359 @@
+"""
+Answer Caches
+Exact-match cache keyed on the normalized question, plus a semantic cache
+of previous answers keyed on question embeddings
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+# =======================
+# Configuration
+# =======================
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "512"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+
+EXACT_CACHE_ENABLED = os.getenv("EXACT_CACHE_ENABLED", "true").lower() == "true"
+EXACT_CACHE_BACKEND = os.getenv("EXACT_CACHE_BACKEND", "memory")  # "memory" or "sqlite"
+EXACT_CACHE_MAX_ENTRIES = int(os.getenv("EXACT_CACHE_MAX_ENTRIES", "2048"))
+EXACT_CACHE_TTL_SECONDS = float(os.getenv("EXACT_CACHE_TTL_SECONDS", "3600"))
+EXACT_CACHE_SQLITE_PATH = os.getenv("EXACT_CACHE_SQLITE_PATH", "answer_cache.sqlite3")
+# SQLite writes take a lock shared by every worker: refresh access times lazily and prune in batches
+EXACT_CACHE_TOUCH_SECONDS = float(os.getenv("EXACT_CACHE_TOUCH_SECONDS", "60"))
+EXACT_CACHE_PRUNE_EVERY = int(os.getenv("EXACT_CACHE_PRUNE_EVERY", "64"))
+
+CORPUS_VERSION_META_KEY = "corpus_version"
+
+def corpus_fingerprint(texts) -> str:
+    """Content hash of the ingested chunks; identical on every worker and across restarts"""
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+# =======================
+# Exact-Match Stores
+# =======================
+class InMemoryAnswerStore:
+    """Per-process LRU + TTL store"""
+
+    name = "memory"
+    blocking = False  # cheap enough to call on the event loop
+
+    def __init__(self, max_entries: int = EXACT_CACHE_MAX_ENTRIES, ttl_seconds: float = EXACT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.meta = {}
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the value for the key, or None if missing / expired"""
+        item = self.entries.get(key)
+        if item is None:
+            return None
+        created, value = item
+        if time.monotonic() - created > self.ttl_seconds:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: dict):
+        """Store the value, evicting least recently used entries"""
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def get_meta(self, name: str) -> Optional[str]:
+        return self.meta.get(name)
+
+    def set_meta(self, name: str, value: str):
+        self.meta[name] = value
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class SQLiteAnswerStore:
+    """
+    Local SQLite file shared by every worker on the host
+    Values are stored as JSON; least recently used rows are pruned past max_entries
+    Calls do file I/O and wait on other workers' locks: keep them off the event loop
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(
+        self,
+        path: str = EXACT_CACHE_SQLITE_PATH,
+        max_entries: int = EXACT_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = EXACT_CACHE_TTL_SECONDS
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._sets_since_prune = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_accessed ON answers(accessed)")
+        # Corpus version lives here too, so every worker scopes its keys to the same corpus
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the value for the key, or None if missing / expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created, accessed FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                return None
+            # LRU order only needs to be roughly right; most hits stay read-only
+            if now - row[2] > EXACT_CACHE_TOUCH_SECONDS:
+                self._conn.execute("UPDATE answers SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict):
+        """Store the value, pruning least recently used rows every EXACT_CACHE_PRUNE_EVERY sets"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, default=str), now, now)
+            )
+            self._sets_since_prune += 1
+            if self._sets_since_prune < EXACT_CACHE_PRUNE_EVERY:
+                return
+            self._sets_since_prune = 0
+            deleted = self._conn.execute(
+                "DELETE FROM answers WHERE key IN ("
+                "SELECT key FROM answers ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self.evictions += max(0, deleted)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+
+    def get_meta(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+def build_exact_answer_store():
+    """Create the configured exact-match store (EXACT_CACHE_BACKEND)"""
+    if EXACT_CACHE_BACKEND == "sqlite":
+        print(f"🗄️ Exact answer cache: shared SQLite store at {EXACT_CACHE_SQLITE_PATH}")
+        return SQLiteAnswerStore()
+    return InMemoryAnswerStore()
+
+# =======================
+# Exact-Match Cache
+# =======================
+class ExactAnswerCache:
+    """Answers keyed by normalized question, k and corpus version"""
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else InMemoryAnswerStore()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(normalized_question: str, k: int, corpus_version: str) -> str:
+        """Store key for a question"""
+        return f"{corpus_version}:{k}:{normalized_question}"
+
+    def lookup(self, normalized_question: str, k: int, corpus_version: str) -> Optional[dict]:
+        """Return the cached value or None"""
+        value = self.store.get(self.make_key(normalized_question, k, corpus_version))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def store_answer(self, normalized_question: str, k: int, corpus_version: str, value: dict):
+        """Cache a JSON-serializable value"""
+        self.store.set(self.make_key(normalized_question, k, corpus_version), value)
+
+    def clear(self):
+        """Drop every entry (called when the corpus changes)"""
+        self.store.clear()
+        self.invalidations += 1
+
+    def corpus_version(self) -> Optional[str]:
+        """Corpus version recorded by the last ingestion (shared across workers with the SQLite store)"""
+        return self.store.get_meta(CORPUS_VERSION_META_KEY)
+
+    def set_corpus_version(self, version: str):
+        self.store.set_meta(CORPUS_VERSION_META_KEY, version)
+
+    def snapshot(self) -> dict:
+        """Counters for the /health endpoint"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": EXACT_CACHE_ENABLED,
+            "backend": self.store.name,
+            "entries": len(self.store),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.store.evictions,
+            "invalidations": self.invalidations,
+        }
+
+# =======================
+# Semantic Cache
+# =======================
+class SemanticAnswerCache:
+    """
+    LRU + TTL cache of answers looked up by cosine similarity of question embeddings
+    Entries are scoped to k and the corpus version they were generated against
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._next_id = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: List[int] = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        arr = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(arr)
+        return arr / norm if norm else arr
+
+    def _rebuild_matrix(self):
+        """Stack entry vectors into one matrix (only after the entry set changed)"""
+        self._matrix_ids = list(self.entries.keys())
+        if self._matrix_ids:
+            self._matrix = np.stack([self.entries[i]["vector"] for i in self._matrix_ids])
+        else:
+            self._matrix = None
+
+    def _remove(self, entry_id: int):
+        self.entries.pop(entry_id, None)
+        self._matrix = None
+
+    def lookup(self, vector, k: int, corpus_version: str) -> Optional[dict]:
+        """Return the cached value for the closest matching question, or None"""
+        if not self.entries:
+            self.misses += 1
+            return None
+
+        if self._matrix is None:
+            self._rebuild_matrix()
+
+        scores = self._matrix @ self._normalize(vector)
+        now = time.monotonic()
+
+        for index in np.argsort(-scores):
+            score = float(scores[index])
+            if score < self.threshold:
+                break
+
+            entry_id = self._matrix_ids[index]
+            entry = self.entries.get(entry_id)
+            if entry is None:
+                continue
+            if now - entry["created"] > self.ttl_seconds:
+                self.expirations += 1
+                self._remove(entry_id)
+                continue
+            if entry["k"] != k or entry["corpus_version"] != corpus_version:
+                continue
+
+            self.entries.move_to_end(entry_id)
+            self.hits += 1
+            return {**entry["value"], "similarity": round(score, 4)}
+
+        self.misses += 1
+        return None
+
+    def store(self, vector, k: int, corpus_version: str, value: dict):
+        """Cache a value for the question embedding, evicting least recently used entries"""
+        self.entries[self._next_id] = {
+            "vector": self._normalize(vector),
+            "k": k,
+            "corpus_version": corpus_version,
+            "value": value,
+            "created": time.monotonic(),
+        }
+        self._next_id += 1
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        self._matrix = None
+
+    def clear(self):
+        """Drop every entry (called when the corpus changes)"""
+        self.entries.clear()
+        self._matrix = None
+        self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        """Counters for the /health endpoint"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": SEMANTIC_CACHE_ENABLED,
+            "threshold": self.threshold,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
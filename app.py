@@ -6,25 +6,49 @@ from pathlib import Path
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI, Form, HTTPException, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional
 from dotenv import load_dotenv
 import asyncio
+import json
+import time
 import traceback
 
+# Load environment variables (before local modules read their configuration)
+load_dotenv()
+
 # Langchain imports
 # from langchain.vectorstores.base import VectorStore
 # from langchain_core.vectorstores import VectorStore
 # from langchain_community.vectorstores import VectorStore
 from langchain_core.vectorstores import VectorStore
 # from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_huggingface import HuggingFaceEmbeddings
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, models
 from langchain_qdrant import QdrantVectorStore
-from langchain_google_genai import ChatGoogleGenerativeAI
-import google.generativeai as genai
+
+# Async Gemini client, key rotation + generation providers
+from gemini_client import close_http_client
+from llm_service import GEMINI_API_KEY_LIST, GEMINI_KEY_CLIENTS, KEY_SCHEDULER, KEY_PACER, HEDGE_STATS
+from providers import build_provider_chain, ExtractiveProvider
+from singleflight import SingleFlight
+from embedding_cache import CachedQueryEmbeddings
+from embedding_backends import build_embeddings, EMBEDDING_MODEL, EMBEDDING_BACKEND
+from embedding_batcher import EmbeddingBatcher, EMBEDDING_BATCHING_ENABLED
+from numpy_store import NumpyVectorStore, NUMPY_INDEX_PATH, use_numpy_index
+from context_builder import build_context, count_tokens, chunk_key, ANSWER_SENTENCES
+from bm25_index import BM25Index, HYBRID_SEARCH_ENABLED, HYBRID_CANDIDATES, BM25_INDEX_PATH, reciprocal_rank_fusion
+from query_router import QueryRouter, EXTRACTIVE_SCORE_THRESHOLD, GREETINGS
+from domain_gate import DomainGate, DOMAIN_CENTROIDS_PATH, OFF_TOPIC_ANSWER
+from adaptive_k import AdaptiveKStats, clamp_k, search_depth, select_chunks
+from intent_router import IntentRouter, INTENT_FILTER_FIELD
+from corpus_metadata import PAYLOAD_INDEX_FIELDS
+from answer_cache import (
+    SemanticAnswerCache, ExactAnswerCache, build_exact_answer_store, corpus_fingerprint,
+    SEMANTIC_CACHE_ENABLED, EXACT_CACHE_ENABLED
+)
 
 # Auth imports
 from auth import (
@@ -48,11 +72,9 @@ from chat_service import (
     init_chat_db
 )
 
-# Load environment variables
-load_dotenv()
-
 from rag_utils import (
     load_md_to_chunks,
+    normalize_question,
     create_qdrant_vectorstore,
     # create_pinecone_vectorstore,
 )
@@ -60,8 +82,6 @@ from rag_utils import (
 # =======================
 # Environment Variables
 # =======================
-GEMINI_API_KEYS = os.getenv("GEMINI_API_KEYS", "")
-GEMINI_API_KEY_LIST = [k.strip() for k in GEMINI_API_KEYS.split(",") if k.strip()]
 print(f"🔑 Loaded {len(GEMINI_API_KEY_LIST)} Gemini API keys")
 
 QDRANT_URL = os.getenv("QDRANT_URL")
@@ -89,90 +109,47 @@ ip_query_limits = defaultdict(lambda: {"count": 0, "reset_time": datetime.utcnow
 print(f"📊 Query Limits: Authenticated={AUTHENTICATED_QUERY_LIMIT}, Public={UNAUTHENTICATED_QUERY_LIMIT}")
 
 # =======================
-# 🔥 API KEY ROTATION LOGIC
-# =======================
-current_key_index = 0
-
-def get_next_api_key():
-    """Get next API key in rotation"""
-    global current_key_index
-    if not GEMINI_API_KEY_LIST:
-        return None
-    
-    key = GEMINI_API_KEY_LIST[current_key_index]
-    current_key_index = (current_key_index + 1) % len(GEMINI_API_KEY_LIST)
-    return key
-
-def try_all_keys_for_genai_call(prompt: str, max_attempts: int = None):
-    """Try calling Gemini API with all available keys until one succeeds"""
-    if max_attempts is None:
-        max_attempts = len(GEMINI_API_KEY_LIST)
-    
-    last_error = None
-    
-    for attempt in range(max_attempts):
-        api_key = get_next_api_key()
-        if not api_key:
-            raise Exception("No API keys available")
-        
-        try:
-            print(f"🔑 Attempt {attempt + 1}/{max_attempts} with key: {api_key[:10]}...")
-            
-            genai.configure(api_key=api_key)
-            
-            direct_model = genai.GenerativeModel(
-                model_name='gemini-2.5-flash',
-                generation_config={
-                    'temperature': 0.3,
-                    'max_output_tokens': 2048,
-                }
-            )
-            
-            response = direct_model.generate_content(prompt)
-            answer = response.text.strip()
-            
-            print(f"✅ Success with key {attempt + 1}")
-            return answer
-            
-        except Exception as e:
-            last_error = e
-            print(f"❌ Key {attempt + 1} failed: {str(e)[:100]}")
-            
-            if attempt == max_attempts - 1:
-                raise Exception(f"All {max_attempts} API keys failed. Last error: {str(last_error)}")
-            
-            continue
-    
-    raise Exception(f"Failed after {max_attempts} attempts")
-
-# =======================
-# Configure Initial Gemini
+# Check Gemini Configuration
 # =======================
 if not GEMINI_API_KEY_LIST:
     print("⚠️ WARNING: GEMINI_API_KEYS not found in .env file!")
-    llm = None
 else:
-    print(f"✅ Gemini API Keys loaded: {len(GEMINI_API_KEY_LIST)} keys")
-    try:
-        genai.configure(api_key=GEMINI_API_KEY_LIST[0])
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.3,
-            max_retries=2,
-            max_output_tokens=1024,
-            google_api_key=GEMINI_API_KEY_LIST[0]
-        )
-        print(f"✅ Gemini initialized with first key")
-    except Exception as e:
-        print(f"⚠️ Initial LLM setup failed: {e}")
-        llm = None
+    print(f"✅ Gemini API Keys loaded: {len(GEMINI_API_KEY_LIST)} keys ({len(GEMINI_KEY_CLIENTS)} clients ready)")
 
 # =======================
 # Global Variables
 # =======================
 VECTOR_STORE: Optional[VectorStore] = None
+BM25_INDEX: Optional[BM25Index] = None
+ADAPTIVE_K_STATS = AdaptiveKStats()
+INTENT_ROUTER = IntentRouter()
+DOMAIN_GATE = DomainGate()
+# Content hash of the ingested chunks, so caches and coalescing never mix corpora. Recorded in the
+# exact-cache store by /ingest_local; with the SQLite store every worker picks it up from there.
+CORPUS_VERSION = "0"
+CORPUS_VERSION_REFRESH_SECONDS = float(os.getenv("CORPUS_VERSION_REFRESH_SECONDS", "2"))
+CORPUS_VERSION_CHECKED = 0.0
+CORPUS_RELOAD_LOCK = asyncio.Lock()
+QUERY_FLIGHTS = SingleFlight()
+SEMANTIC_CACHE = SemanticAnswerCache()
+EXACT_CACHE = ExactAnswerCache(build_exact_answer_store())
+GENERATION = build_provider_chain()
 LOCAL_QDRANT_PATH = Path("local_qdrant")
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# Concurrent query embeddings share one forward pass (the sidecar batches across workers itself)
+EMBEDDING_MODEL_INSTANCE = build_embeddings()
+EMBEDDING_BATCHER = (
+    EmbeddingBatcher(EMBEDDING_MODEL_INSTANCE)
+    if EMBEDDING_BATCHING_ENABLED and EMBEDDING_BACKEND != "sidecar" else None
+)
+# Repeated questions skip the MiniLM forward pass (serves retrieval and the semantic cache)
+embeddings = CachedQueryEmbeddings(
+    EMBEDDING_BATCHER or EMBEDDING_MODEL_INSTANCE,
+    f"{EMBEDDING_MODEL}:{EMBEDDING_BACKEND}"
+)
+
+# Embedding forward passes and Qdrant calls are blocking; they run here, never on the event loop
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+RETRIEVAL_EXECUTOR = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
 
 # =======================
 # Helper Functions for Query Limits
@@ -297,9 +274,22 @@ async def increment_query_count(user_id: str = None, ip_address: str = None):
 # Load Vectorstore
 # =======================
 def load_existing_vectorstore():
-    global VECTOR_STORE
+    global VECTOR_STORE, BM25_INDEX
     
     try:
+        BM25_INDEX = BM25Index.load(BM25_INDEX_PATH)
+        if BM25_INDEX is not None:
+            print(f"🔤 Loaded BM25 keyword index ({len(BM25_INDEX)} chunks)")
+        DOMAIN_GATE.load(DOMAIN_CENTROIDS_PATH)
+
+        # Small corpora are served from the in-process index (no network round-trip per query)
+        saved_chunks = NumpyVectorStore.saved_size(NUMPY_INDEX_PATH)
+        if saved_chunks is not None and use_numpy_index(saved_chunks):
+            print(f"📂 Loading in-process NumPy index from: {NUMPY_INDEX_PATH}")
+            VECTOR_STORE = NumpyVectorStore.load(embeddings, NUMPY_INDEX_PATH)
+            print(f"✅ Loaded NumPy index ({saved_chunks} chunks, memory-mapped)")
+            return
+
         if QDRANT_URL and QDRANT_API_KEY:
             print(f"🔗 Connecting to remote Qdrant: {QDRANT_URL}")
             client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
@@ -328,13 +318,61 @@ def load_existing_vectorstore():
         print(f"❌ Vectorstore load failed: {e}")
         traceback.print_exc()
 
+def recorded_corpus_version() -> Optional[str]:
+    """Version recorded by the last ingestion; a locked or broken cache store counts as none"""
+    try:
+        return EXACT_CACHE.corpus_version()
+    except Exception as e:
+        print(f"⚠️ Could not read the corpus version from the answer cache: {e}")
+        return None
+
+def load_corpus_version() -> str:
+    """Version recorded by the last ingestion, else a hash of the saved keyword index, else "0" """
+    recorded = recorded_corpus_version()
+    if recorded:
+        return recorded
+    if BM25_INDEX is not None:
+        return corpus_fingerprint(doc.page_content for doc in BM25_INDEX.documents)
+    return "0"
+
+async def refresh_corpus_version():
+    """
+    Pick up an ingestion made by another worker (checked at most every CORPUS_VERSION_REFRESH_SECONDS)
+    The local indexes are reloaded before the new version is adopted, so this worker never
+    writes answers from the old corpus under the new version's cache keys
+    """
+    global CORPUS_VERSION, CORPUS_VERSION_CHECKED
+
+    now = time.monotonic()
+    if CORPUS_RELOAD_LOCK.locked() or now - CORPUS_VERSION_CHECKED < CORPUS_VERSION_REFRESH_SECONDS:
+        return
+    CORPUS_VERSION_CHECKED = now
+
+    async with CORPUS_RELOAD_LOCK:
+        recorded = await run_blocking(recorded_corpus_version)
+        if not recorded or recorded == CORPUS_VERSION:
+            return
+
+        print(f"🔄 Corpus version changed: {CORPUS_VERSION} -> {recorded}, reloading indexes")
+        await run_blocking(load_existing_vectorstore)
+        if BM25_INDEX is not None:
+            loaded = corpus_fingerprint(doc.page_content for doc in BM25_INDEX.documents)
+            if loaded != recorded:
+                print(f"⚠️ Reloaded index is version {loaded}, expected {recorded}")
+        CORPUS_VERSION = recorded
+        SEMANTIC_CACHE.clear()
+
 # =======================
 # FastAPI Initialization
 # =======================
 @asynccontextmanager
 async def lifespan(app):
+    global CORPUS_VERSION
+
     print("📦 Loading vectorstore...")
     load_existing_vectorstore()
+    CORPUS_VERSION = load_corpus_version()
+    print(f"🏷️ Corpus version: {CORPUS_VERSION}")
     print("🔐 Initializing database...")
     await init_db()
     print("💬 Initializing chat database...")
@@ -342,6 +380,8 @@ async def lifespan(app):
     print("✅ Startup complete\n")
     yield
     print("\n👋 Shutting down...")
+    await close_http_client()
+    RETRIEVAL_EXECUTOR.shutdown(wait=False)
 
 app = FastAPI(
     title="Enhanced Personal Chatbot Backend",
@@ -391,14 +431,436 @@ async def verify_token(current_user: dict = Depends(get_current_user)):
 # =======================
 # Internal Query Function
 # =======================
-async def query_rag_internal(
-    q: str, 
-    k: int = 1, 
-    user_id: Optional[str] = None, 
-    ip_address: Optional[str] = None,
-    chat_id: Optional[str] = None
+DEFAULT_ANSWER = "I'm Kashaf's AI assistant — I may not have this detail, but I can help you explore it."
+LLM_ERROR_ANSWER = "I encountered an error while processing your question."
+
+EXTRACTOR = ExtractiveProvider()
+QUERY_ROUTER = QueryRouter()
+
+def build_prompt(q: str, docs: list, sentences: int = ANSWER_SENTENCES) -> tuple:
+    """
+    Build the Gemini prompt from retrieved documents (highest-ranked first)
+    Returns the prompt and the docs that fit in the context budget
+    """
+    context, used_docs = build_context(docs)
+    print(f"📝 Context: {len(used_docs)}/{len(docs)} chunks, ~{count_tokens(context)} tokens")
+
+    prompt = f"""You are answering as Kashaf Naveed — a professional MERN + AI Developer.
+Answer clearly, concisely and professionally in at most {sentences} sentences.
+
+Context:
+{context}
+
+Question: {q}
+
+Answer:"""
+    return prompt, used_docs
+
+def build_sources(docs: list) -> list:
+    """Build the sources list returned to the client"""
+    return [
+        {
+            "page_no": doc.metadata.get("chunk_no", "N/A"),
+            "source": doc.metadata.get("source", "Unknown"),
+            # "file_name": doc.metadata.get("filename", "Unknown"),
+            "snippet": doc.page_content[:200] + "...",
+        }
+        for doc in docs
+    ]
+
+async def check_query_limit(user_id: Optional[str] = None, ip_address: Optional[str] = None) -> dict:
+    """
+    Check query limits for the caller
+    Returns {"response": {...}} when the query is refused, else {"limit_check": {...}}
+    """
+    if user_id:
+        limit_check = await check_authenticated_user_limit(str(user_id))
+    elif ip_address:
+        limit_check = check_unauthenticated_user_limit(ip_address)
+    else:
+        return {"response": {
+            "answer": "Unable to process request.",
+            "sources": [],
+            "error": "No user identification"
+        }}
+    
+    if not limit_check["allowed"]:
+        print(f"❌ Query limit exceeded")
+        return {"response": {
+            "answer": limit_check["message"],
+            "sources": [],
+            "limit_exceeded": True,
+            "limit_info": limit_check
+        }}
+    
+    print(f"✅ Query limit check passed: {limit_check['current']}/{limit_check['limit']}")
+    return {"limit_check": limit_check}
+
+def vectorstore_filter(topics: Optional[list]):
+    """Topic restriction in the active vectorstore's filter format (None = whole corpus)"""
+    if not topics:
+        return None
+    if isinstance(VECTOR_STORE, NumpyVectorStore):
+        return INTENT_ROUTER.search_filter(topics)
+    return models.Filter(must=[
+        models.FieldCondition(key=f"metadata.{INTENT_FILTER_FIELD}", match=models.MatchAny(any=topics))
+    ])
+
+def dense_search(q: str, k: int, query_vector: Optional[list] = None, topics: Optional[list] = None) -> list:
+    """(doc, cosine score) pairs from the vectorstore, optionally restricted to topics"""
+    search_filter = vectorstore_filter(topics)
+    if query_vector is not None:
+        return VECTOR_STORE.similarity_search_with_score_by_vector(query_vector, k=k, filter=search_filter)
+    return VECTOR_STORE.similarity_search_with_score(q, k=k, filter=search_filter)
+
+def score_keyword_hits(q: str, query_vector: Optional[list], docs: list, scores: list) -> list:
+    """Fill in cosine scores for keyword-only hits from the in-process index rows (Qdrant leaves them None)"""
+    missing = [doc for doc, score in zip(docs, scores) if score is None]
+    if not missing or not isinstance(VECTOR_STORE, NumpyVectorStore):
+        return scores
+    if query_vector is None:
+        query_vector = embeddings.embed_query(q)
+    filled = iter(VECTOR_STORE.score_documents(query_vector, missing))
+    return [score if score is not None else next(filled) for score in scores]
+
+def search_chunks(q: str, k: int, query_vector: Optional[list] = None, topics: Optional[list] = None) -> tuple:
+    """Ranked (docs, scores): dense, or dense + BM25 fused when the keyword index is loaded"""
+    depth = search_depth(k)
+    if HYBRID_SEARCH_ENABLED and BM25_INDEX is not None:
+        dense = dense_search(q, max(depth, HYBRID_CANDIDATES), query_vector, topics)
+        lexical = BM25_INDEX.search(q, max(depth, HYBRID_CANDIDATES), INTENT_ROUTER.search_filter(topics))
+        fused = reciprocal_rank_fusion([dense, lexical])[:depth]
+        dense_scores = {chunk_key(doc): float(score) for doc, score in dense}
+        docs = [doc for doc, _ in fused]
+        scores = [dense_scores.get(chunk_key(doc)) for doc in docs]
+        scores = score_keyword_hits(q, query_vector, docs, scores)
+        print(f"📄 Retrieved {len(docs)} documents (hybrid: {len(dense)} dense + {len(lexical)} keyword candidates)")
+    else:
+        results = dense_search(q, depth, query_vector, topics)
+        docs = [doc for doc, _ in results]
+        scores = [float(score) for _, score in results]
+        print(f"📄 Retrieved {len(docs)} documents (top score {scores[0] if scores else 0:.3f})")
+    return docs, scores
+
+def retrieve_documents(q: str, k: int, query_vector: Optional[list] = None) -> dict:
+    """
+    Search the vectorstore (reusing the query embedding when the caller already has one),
+    fused with BM25 keyword hits when the keyword index is loaded, and restricted to the
+    topics the intent router picks (whole corpus again if that finds nothing)
+    k is the minimum to keep; adaptive k may keep more, up to RETRIEVAL_MAX_K, while scores hold up
+    Returns {"response": {...}} when nothing can be retrieved, else {"docs": [...], "scores": [...]}
+    (scores are cosine similarities; None for chunks only the keyword index found)
+    """
+    if VECTOR_STORE is None:
+        print("❌ VECTOR_STORE is None")
+        return {"response": {
+            "answer": "Knowledge base not initialized.",
+            "sources": []
+        }}
+
+    topics = INTENT_ROUTER.classify(q)
+    print(f"📚 Searching vectorstore ({', '.join(topics) if topics else 'all topics'})...")
+    try:
+        docs, scores = search_chunks(q, k, query_vector, topics)
+        if not docs and topics:
+            # Index built before topic metadata existed, or the intent guess was wrong
+            INTENT_ROUTER.fallbacks += 1
+            docs, scores = search_chunks(q, k, query_vector)
+    except Exception as search_error:
+        print(f"❌ Search error: {search_error}")
+        traceback.print_exc()
+        return {"response": {
+            "answer": "Error searching the knowledge base.",
+            "sources": []
+        }}
+    
+    if not docs:
+        print("⚠️ No documents found")
+        return {"response": {
+            "answer": "I don't have enough information to answer this question.",
+            "sources": []
+        }}
+
+    docs, scores = select_chunks(docs, scores, k)
+    ADAPTIVE_K_STATS.record(len(docs))
+    print(f"✂️ Adaptive k: keeping {len(docs)} chunks")
+    return {"docs": docs, "scores": scores}
+
+async def run_blocking(fn, *args):
+    """Run a blocking embedding / vectorstore call on the retrieval executor"""
+    return await asyncio.get_running_loop().run_in_executor(RETRIEVAL_EXECUTOR, fn, *args)
+
+async def aretrieve_documents(q: str, k: int, query_vector: Optional[list] = None) -> dict:
+    """retrieve_documents without blocking the event loop (the query is embedded through the batcher)"""
+    if query_vector is None and VECTOR_STORE is not None:
+        query_vector = await embeddings.aembed_query(q)
+    return await run_blocking(retrieve_documents, q, k, query_vector)
+
+def top_score(scores: Optional[list]) -> Optional[float]:
+    """Best cosine score among the retrieved chunks (keyword-only hits have none)"""
+    scored = [score for score in (scores or []) if score is not None]
+    return max(scored) if scored else None
+
+def extractive_answer(q: str, docs: list, scores: Optional[list]) -> tuple:
+    """
+    Answer taken verbatim from the chunks scoring above EXTRACTIVE_SCORE_THRESHOLD
+    Returns (answer, docs used), or (None, None) when nothing matches the question
+    """
+    confident = [
+        doc for doc, score in zip(docs, scores)
+        if score is not None and score >= EXTRACTIVE_SCORE_THRESHOLD
+    ]
+    answer = EXTRACTOR.extract(q, confident, require_overlap=True)
+    if not answer:
+        return None, None
+    print(f"⚡ Extractive fast path (score {top_score(scores):.3f}), skipping the LLM")
+    return answer, confident
+
+def route_query(q: str, docs: list, scores: Optional[list]) -> dict:
+    """
+    Pick the route for a question, resolving the extractive route right away
+    Returns {"route", "reason", "answer" (extractive only), "docs"}
+    """
+    route, reason = QUERY_ROUTER.classify(q, scores)
+    if route == "extractive":
+        answer, extracted_docs = extractive_answer(q, docs, scores)
+        if answer:
+            return {"route": route, "reason": reason, "answer": answer, "docs": extracted_docs}
+        QUERY_ROUTER.extractive_misses += 1
+        route, reason = QUERY_ROUTER.classify(q, scores, allow_extractive=False)
+
+    print(f"🧭 Route: {route} ({reason})")
+    return {"route": route, "reason": reason, "answer": None, "docs": docs}
+
+async def exact_cache_call(fn, *args):
+    """Call the exact cache, on the retrieval executor when its store does blocking I/O"""
+    if EXACT_CACHE.store.blocking:
+        return await run_blocking(fn, *args)
+    return fn(*args)
+
+async def lookup_cached_answer(q: str, k: int, query_vector: Optional[list] = None) -> dict:
+    """
+    Check the exact-match cache, then the semantic cache (embedding q unless a vector is given)
+    Returns {"cached": {...} or None, "cache_hit": tier or None, "query_vector": [...] or None}
+    """
+    if EXACT_CACHE_ENABLED:
+        try:
+            cached = await exact_cache_call(EXACT_CACHE.lookup, normalize_question(q), k, CORPUS_VERSION)
+        except Exception as cache_error:
+            # A locked or corrupt cache store is a miss, not a failed query
+            print(f"⚠️ Exact cache lookup failed: {cache_error}")
+            cached = None
+        if cached:
+            print(f"⚡ Exact cache hit")
+            return {"cached": cached, "cache_hit": "exact", "query_vector": query_vector}
+
+    if not SEMANTIC_CACHE_ENABLED:
+        return {"cached": None, "cache_hit": None, "query_vector": query_vector}
+
+    if query_vector is None:
+        query_vector = await embeddings.aembed_query(q)
+    cached = SEMANTIC_CACHE.lookup(query_vector, k, CORPUS_VERSION)
+    if cached:
+        print(f"⚡ Semantic cache hit (similarity {cached['similarity']})")
+        return {"cached": cached, "cache_hit": "semantic", "query_vector": query_vector}
+    return {"cached": None, "cache_hit": None, "query_vector": query_vector}
+
+def store_cached_answer(
+    q: str,
+    query_vector: Optional[list],
+    k: int,
+    corpus_version: str,
+    answer: str,
+    sources: list
 ):
-    """Internal query function with query limit checking and chat history"""
+    """Remember a successful answer in the exact and semantic caches"""
+    if answer in (LLM_ERROR_ANSWER, DEFAULT_ANSWER):
+        return
+    value = {"answer": answer, "sources": sources}
+    if EXACT_CACHE_ENABLED:
+        store_args = (normalize_question(q), k, corpus_version, value)
+        if EXACT_CACHE.store.blocking:
+            # Fire and forget: the caller never waits on the shared SQLite lock
+            RETRIEVAL_EXECUTOR.submit(EXACT_CACHE.store_answer, *store_args)
+        else:
+            EXACT_CACHE.store_answer(*store_args)
+    if SEMANTIC_CACHE_ENABLED and query_vector is not None:
+        SEMANTIC_CACHE.store(query_vector, k, corpus_version, value)
+
+async def generate_answer(
+    q: str,
+    k: int,
+    docs: list,
+    query_vector: Optional[list],
+    corpus_version: str,
+    scores: Optional[list] = None
+) -> dict:
+    """Route the question, then answer extractively or generate with the provider chain; caches the answer"""
+    started = time.monotonic()
+    routed = route_query(q, docs, scores)
+    route = routed["route"]
+
+    if routed["answer"]:
+        answer = routed["answer"]
+        sources = build_sources(routed["docs"])
+        store_cached_answer(q, query_vector, k, corpus_version, answer, sources)
+        QUERY_ROUTER.record(route, routed["reason"], started, answer_tokens=count_tokens(answer))
+        return {
+            "answer": answer,
+            "sources": sources,
+            "provider": EXTRACTOR.name,
+            "route": route,
+            "retrieval_score": round(top_score(scores), 4),
+            "retrieved_k": len(docs)
+        }
+
+    retrieved_k = len(docs)
+    settings = QUERY_ROUTER.generation_settings(route)
+    prompt, docs = build_prompt(q, docs, settings["sentences"])
+    print(f"🤖 Generating answer (providers: {', '.join(p.name for p in GENERATION.active_providers())})...")
+    provider = None
+    try:
+        answer, provider = await GENERATION.generate(
+            q, prompt, docs, settings["generation_config"], settings["model_name"]
+        )
+        print(f"✅ Response received")
+        print(f"📏 Answer length: {len(answer)} chars")
+        
+    except Exception as llm_error:
+        print(f"❌ All generation providers failed: {llm_error}")
+        traceback.print_exc()
+        answer = LLM_ERROR_ANSWER
+    
+    if not answer:
+        answer = DEFAULT_ANSWER
+
+    QUERY_ROUTER.record(route, routed["reason"], started, count_tokens(prompt), count_tokens(answer))
+    sources = build_sources(docs)
+    if provider is not None and provider.cacheable:
+        store_cached_answer(q, query_vector, k, corpus_version, answer, sources)
+    return {
+        "answer": answer,
+        "sources": sources,
+        "provider": provider.name if provider else None,
+        "route": route,
+        "retrieved_k": retrieved_k
+    }
+
+def cached_result(lookup: dict) -> dict:
+    """Result dict for a cache hit"""
+    return {
+        "answer": lookup["cached"]["answer"],
+        "sources": lookup["cached"]["sources"],
+        "cache_hit": lookup["cache_hit"]
+    }
+
+async def retrieve_and_generate(q: str, k: int) -> dict:
+    """
+    Cache lookup, retrieval and generation, shared by coalesced callers
+    Returns {"response": {...}} when retrieval ends early, else answer and sources
+    """
+    corpus_version = CORPUS_VERSION
+    lookup = await lookup_cached_answer(q, k)
+    if lookup["cached"]:
+        return cached_result(lookup)
+
+    query_vector = await gate_query_vector(q, lookup["query_vector"])
+    off_topic = off_topic_result(q, query_vector)
+    if off_topic:
+        return off_topic
+
+    retrieved = await aretrieve_documents(q, k, query_vector=query_vector)
+    if "response" in retrieved:
+        return retrieved
+
+    return await generate_answer(
+        q, k, retrieved["docs"], query_vector, corpus_version, scores=retrieved["scores"]
+    )
+
+async def gate_query_vector(q: str, query_vector: Optional[list]) -> Optional[list]:
+    """The cache lookup's query vector, embedding q only if the domain gate needs one"""
+    if query_vector is None and DOMAIN_GATE.ready:
+        query_vector = await embeddings.aembed_query(q)
+    return query_vector
+
+def off_topic_result(q: str, query_vector: Optional[list]) -> Optional[dict]:
+    """
+    Canned answer when the question is far from every corpus centroid, else None
+    Runs after the cache checks; off-topic questions skip retrieval and the LLM
+    and are not charged to the caller's quota
+    """
+    if not DOMAIN_GATE.ready or query_vector is None or normalize_question(q) in GREETINGS:
+        return None
+    verdict = DOMAIN_GATE.check(query_vector)
+    if verdict["on_topic"]:
+        return None
+    print(f"🚫 Off-topic question (similarity {verdict['similarity']}, nearest: {verdict['nearest']})")
+    return {
+        "answer": OFF_TOPIC_ANSWER,
+        "sources": [],
+        "off_topic": True,
+        "domain_similarity": verdict["similarity"]
+    }
+
+def query_flight_key(q: str, k: int) -> tuple:
+    """Coalescing key: normalized question, k and corpus version"""
+    return (normalize_question(q), k, CORPUS_VERSION)
+
+async def finalize_query(
+    q: str,
+    answer: str,
+    sources: list,
+    limit_check: dict,
+    user_id: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    chat_id: Optional[str] = None,
+    charge: bool = True
+) -> dict:
+    """Charge the query (unless charge is False), save it to chat history and build the final response"""
+    # Increment query count AFTER successful query
+    if charge:
+        await increment_query_count(user_id=str(user_id) if user_id else None, ip_address=ip_address)
+    charged = 1 if charge else 0
+
+    # ✨ SAVE TO CHAT HISTORY (only for authenticated users with chat_id)
+    if user_id and chat_id:
+        try:
+            # Save user message
+            await add_message_to_chat(
+                chat_id=chat_id,
+                user_id=str(user_id),
+                role="user",
+                content=q,
+                auto_title=True  # Auto-generate title from first message
+            )
+            
+            # Save assistant response
+            await add_message_to_chat(
+                chat_id=chat_id,
+                user_id=str(user_id),
+                role="assistant",
+                content=answer,
+                sources=sources,
+                auto_title=False  # Don't update title from assistant messages
+            )
+            print(f"💾 Messages saved to chat history")
+        except Exception as save_error:
+            print(f"⚠️ Failed to save to chat history: {save_error}")
+
+    return {
+        "answer": answer,
+        "sources": sources,
+        "limit_info": {
+            "current": limit_check["current"] + charged,
+            "limit": limit_check["limit"],
+            "remaining": limit_check["remaining"] - charged
+        },
+        "chat_id": chat_id, 
+        "messages_saved": True if (user_id and chat_id) else False
+    }
+
+def log_query_start(q: str, user_id: Optional[str], ip_address: Optional[str], chat_id: Optional[str]):
+    """Print the query banner"""
     print(f"\n{'='*60}")
     print(f"🔍 Processing Query: '{q}'")
     if user_id:
@@ -408,145 +870,306 @@ async def query_rag_internal(
     else:
         print(f"🌐 Non-authenticated IP: {ip_address}")
     print(f"{'='*60}")
-    
-    global VECTOR_STORE
+
+async def query_rag_internal(
+    q: str, 
+    k: int = 1, 
+    user_id: Optional[str] = None, 
+    ip_address: Optional[str] = None,
+    chat_id: Optional[str] = None
+):
+    """Internal query function with query limit checking and chat history"""
+    k = clamp_k(k)
+    log_query_start(q, user_id, ip_address, chat_id)
     
     try:
-        # Check query limits
-        if user_id:
-            limit_check = await check_authenticated_user_limit(str(user_id))
-        elif ip_address:
-            limit_check = check_unauthenticated_user_limit(ip_address)
-        else:
-            return {
-                "answer": "Unable to process request.",
-                "sources": [],
-                "error": "No user identification"
-            }
-        
-        if not limit_check["allowed"]:
-            print(f"❌ Query limit exceeded")
-            return {
-                "answer": limit_check["message"],
-                "sources": [],
-                "limit_exceeded": True,
-                "limit_info": limit_check
-            }
-        
-        print(f"✅ Query limit check passed: {limit_check['current']}/{limit_check['limit']}")
+        await refresh_corpus_version()
+        limited = await check_query_limit(user_id=user_id, ip_address=ip_address)
+        if "response" in limited:
+            return limited["response"]
+
+        # Identical concurrent questions share one retrieval + generation
+        generated = await QUERY_FLIGHTS.do(
+            query_flight_key(q, k),
+            lambda: retrieve_and_generate(q, k)
+        )
+        if "response" in generated:
+            return dict(generated["response"])
         
-        if VECTOR_STORE is None:
-            print("❌ VECTOR_STORE is None")
-            return {
-                "answer": "Knowledge base not initialized.",
-                "sources": []
-            }
+        result = await finalize_query(
+            q, generated["answer"], generated["sources"], limited["limit_check"],
+            user_id=user_id, ip_address=ip_address, chat_id=chat_id,
+            charge=not generated.get("off_topic")
+        )
+        if generated.get("cache_hit"):
+            result["cache_hit"] = generated["cache_hit"]
+        if generated.get("off_topic"):
+            result["off_topic"] = True
+            result["domain_similarity"] = generated["domain_similarity"]
+        for field in ("provider", "route", "retrieval_score", "retrieved_k"):
+            if generated.get(field):
+                result[field] = generated[field]
 
-        print(f"📚 Searching vectorstore...")
-        try:
-            docs = VECTOR_STORE.similarity_search(q, k=k)
-            print(f"📄 Retrieved {len(docs)} documents")
-        except Exception as search_error:
-            print(f"❌ Search error: {search_error}")
-            traceback.print_exc()
-            return {
-                "answer": "Error searching the knowledge base.",
-                "sources": []
-            }
-        
-        if not docs:
-            print("⚠️ No documents found")
-            return {
-                "answer": "I don't have enough information to answer this question.",
-                "sources": []
-            }
+        print(f"✅ Query processed successfully\n")
+        return result
+    
+    except Exception as e:
+        print(f"❌ Unexpected error: {e}")
+        traceback.print_exc()
+        return {
+            "answer": f"An error occurred: {str(e)}",
+            "sources": []
+        }
 
-        context = "\n\n".join([doc.page_content[:500] for doc in docs])
-        print(f"📝 Context length: {len(context)} chars")
+# =======================
+# Streaming Query Function
+# =======================
+def format_sse(event: str, data: dict) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
-        prompt = f"""You are answering as Kashaf Naveed — a professional MERN + AI Developer.
-Answer clearly, concisely and professionally in 3-4 sentences.
+def wants_event_stream(request: Request) -> bool:
+    """Check whether the client asked for Server-Sent Events"""
+    return "text/event-stream" in request.headers.get("accept", "")
 
-Context:
-{context}
+async def stream_query_rag_internal(
+    q: str,
+    k: int = 1,
+    user_id: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    chat_id: Optional[str] = None
+):
+    """
+    Streaming variant of query_rag_internal (yields SSE strings)
+    Events: sources -> token* -> done (final response, same shape as the JSON routes)
+    """
+    k = clamp_k(k)
+    log_query_start(q, user_id, ip_address, chat_id)
 
-Question: {q}
+    try:
+        await refresh_corpus_version()
+        limited = await check_query_limit(user_id=user_id, ip_address=ip_address)
+        if "response" in limited:
+            yield format_sse("done", limited["response"])
+            return
 
-Answer:"""
-        
-        print(f"🤖 Calling Gemini API with key rotation...")
+        corpus_version = CORPUS_VERSION
+        lookup = await lookup_cached_answer(q, k)
+        cached = lookup["cached"]
+        if cached:
+            sources = cached["sources"]
+            yield format_sse("sources", {"sources": sources})
+            yield format_sse("token", {"text": cached["answer"]})
+            result = await finalize_query(
+                q, cached["answer"], sources, limited["limit_check"],
+                user_id=user_id, ip_address=ip_address, chat_id=chat_id
+            )
+            result["cache_hit"] = lookup["cache_hit"]
+            yield format_sse("done", result)
+            return
+
+        query_vector = await gate_query_vector(q, lookup["query_vector"])
+        off_topic = off_topic_result(q, query_vector)
+        if off_topic:
+            yield format_sse("sources", {"sources": []})
+            yield format_sse("token", {"text": off_topic["answer"]})
+            result = await finalize_query(
+                q, off_topic["answer"], [], limited["limit_check"],
+                user_id=user_id, ip_address=ip_address, chat_id=chat_id, charge=False
+            )
+            result["off_topic"] = True
+            result["domain_similarity"] = off_topic["domain_similarity"]
+            yield format_sse("done", result)
+            return
+
+        retrieved = await aretrieve_documents(q, k, query_vector=query_vector)
+        if "response" in retrieved:
+            yield format_sse("done", retrieved["response"])
+            return
+
+        started = time.monotonic()
+        routed = route_query(q, retrieved["docs"], retrieved["scores"])
+        route = routed["route"]
+        if routed["answer"]:
+            extracted = routed["answer"]
+            sources = build_sources(routed["docs"])
+            yield format_sse("sources", {"sources": sources})
+            yield format_sse("token", {"text": extracted})
+            store_cached_answer(q, query_vector, k, corpus_version, extracted, sources)
+            QUERY_ROUTER.record(route, routed["reason"], started, answer_tokens=count_tokens(extracted))
+            result = await finalize_query(
+                q, extracted, sources, limited["limit_check"],
+                user_id=user_id, ip_address=ip_address, chat_id=chat_id
+            )
+            result["provider"] = EXTRACTOR.name
+            result["route"] = route
+            result["retrieval_score"] = round(top_score(retrieved["scores"]), 4)
+            result["retrieved_k"] = len(retrieved["docs"])
+            yield format_sse("done", result)
+            return
+
+        settings = QUERY_ROUTER.generation_settings(route)
+        prompt, docs = build_prompt(q, retrieved["docs"], settings["sentences"])
+        sources = build_sources(docs)
+        yield format_sse("sources", {"sources": sources})
+
+        print(f"🤖 Streaming answer (providers: {', '.join(p.name for p in GENERATION.active_providers())})...")
+        chunks = []
+        provider = None
+        stream_failed = False
         try:
-            answer = await asyncio.to_thread(try_all_keys_for_genai_call, prompt)
-            print(f"✅ Response received")
-            print(f"📏 Answer length: {len(answer)} chars")
-            
+            async for provider, chunk in GENERATION.stream(
+                q, prompt, docs, settings["generation_config"], settings["model_name"]
+            ):
+                chunks.append(chunk)
+                yield format_sse("token", {"text": chunk})
         except Exception as llm_error:
-            print(f"❌ All API keys failed: {llm_error}")
+            print(f"❌ Streaming failed: {llm_error}")
             traceback.print_exc()
-            answer = "I encountered an error while processing your question."
-        
+            stream_failed = True
+            if not chunks:
+                chunks = [LLM_ERROR_ANSWER]
+                yield format_sse("token", {"text": LLM_ERROR_ANSWER})
+
+        answer = "".join(chunks).strip()
         if not answer:
-            answer = "I'm Kashaf's AI assistant — I may not have this detail, but I can help you explore it."
-        
-        # Increment query count AFTER successful query
-        await increment_query_count(user_id=str(user_id) if user_id else None, ip_address=ip_address)
-        
-        sources = [
-            {
-                "page_no": doc.metadata.get("chunk_no", "N/A"),
-                "source": doc.metadata.get("source", "Unknown"),
-                # "file_name": doc.metadata.get("filename", "Unknown"),
-                "snippet": doc.page_content[:200] + "...",
-            }
-            for doc in docs
-        ]
+            answer = DEFAULT_ANSWER
+            yield format_sse("token", {"text": answer})
 
-        # ✨ SAVE TO CHAT HISTORY (only for authenticated users with chat_id)
-        if user_id and chat_id:
-            try:
-                # Save user message
-                await add_message_to_chat(
-                    chat_id=chat_id,
-                    user_id=str(user_id),
-                    role="user",
-                    content=q,
-                    auto_title=True  # Auto-generate title from first message
-                )
-                
-                # Save assistant response
-                await add_message_to_chat(
-                    chat_id=chat_id,
-                    user_id=str(user_id),
-                    role="assistant",
-                    content=answer,
-                    sources=sources,
-                    auto_title=False  # Don't update title from assistant messages
-                )
-                print(f"💾 Messages saved to chat history")
-            except Exception as save_error:
-                print(f"⚠️ Failed to save to chat history: {save_error}")
+        QUERY_ROUTER.record(route, routed["reason"], started, count_tokens(prompt), count_tokens(answer))
+        if not stream_failed and provider is not None and provider.cacheable:
+            store_cached_answer(q, query_vector, k, corpus_version, answer, sources)
+
+        result = await finalize_query(
+            q, answer, sources, limited["limit_check"],
+            user_id=user_id, ip_address=ip_address, chat_id=chat_id
+        )
+        if provider is not None:
+            result["provider"] = provider.name
+        result["route"] = route
+        result["retrieved_k"] = len(retrieved["docs"])
+        print(f"✅ Streamed query processed successfully\n")
+        yield format_sse("done", result)
 
-        print(f"✅ Query processed successfully\n")
-        return {
-            "answer": answer,
-            "sources": sources,
-            "limit_info": {
-                "current": limit_check["current"] + 1,
-                "limit": limit_check["limit"],
-                "remaining": limit_check["remaining"] - 1
-            },
-            "chat_id": chat_id, 
-            "messages_saved": True if (user_id and chat_id) else False
-        }
-    
     except Exception as e:
-        print(f"❌ Unexpected error: {e}")
+        print(f"❌ Unexpected streaming error: {e}")
         traceback.print_exc()
+        yield format_sse("error", {"answer": f"An error occurred: {str(e)}", "sources": []})
+
+def sse_response(events) -> StreamingResponse:
+    """Wrap an SSE generator in a streaming response"""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# =======================
+# Batch Query Function
+# =======================
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "50"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+async def reserve_authenticated_queries(user_id: str, count: int) -> dict:
+    """
+    Atomically charge `count` queries to the user, or none of them
+    Uses a conditional $inc so concurrent requests cannot overshoot the limit
+    """
+    from bson import ObjectId
+
+    limit_check = await check_authenticated_user_limit(user_id)  # also handles the daily reset
+    if not limit_check["allowed"] or limit_check["remaining"] < count:
         return {
-            "answer": f"An error occurred: {str(e)}",
-            "sources": []
+            "allowed": False,
+            "message": limit_check.get("message") or
+                f"Batch of {count} questions exceeds your remaining daily queries ({limit_check.get('remaining', 0)}).",
+            "limit": AUTHENTICATED_QUERY_LIMIT,
+            "current": limit_check.get("current"),
+            "remaining": limit_check.get("remaining", 0)
         }
 
+    try:
+        user_key = ObjectId(user_id)
+    except Exception:
+        user_key = user_id
+
+    update = await users_collection.update_one(
+        {"_id": user_key, "query_count": {"$lte": AUTHENTICATED_QUERY_LIMIT - count}},
+        {"$inc": {"query_count": count}}
+    )
+    if update.modified_count == 0:
+        return {
+            "allowed": False,
+            "message": "Query limit changed while reserving the batch. Please retry.",
+            "limit": AUTHENTICATED_QUERY_LIMIT
+        }
+
+    return {
+        "allowed": True,
+        "limit": AUTHENTICATED_QUERY_LIMIT,
+        "current": limit_check["current"] + count,
+        "remaining": limit_check["remaining"] - count
+    }
+
+async def batch_query_items(questions: list, k: int):
+    """
+    Answer many questions at once, yielding (index, result) as items finish
+    One batched embedding call for uncached questions, retrievals run together, Gemini calls fan out under a semaphore
+    """
+    await refresh_corpus_version()
+    corpus_version = CORPUS_VERSION
+    print(f"📦 Batch of {len(questions)} questions (concurrency {BATCH_CONCURRENCY})")
+
+    vectors = await run_blocking(embeddings.embed_queries, questions)
+    lookups = [
+        await lookup_cached_answer(q, k, query_vector=vector)
+        for q, vector in zip(questions, vectors)
+    ]
+
+    pending = [i for i, lookup in enumerate(lookups) if not lookup["cached"]]
+    for i, lookup in enumerate(lookups):
+        if lookup["cached"]:
+            yield i, cached_result(lookup)
+
+    retrievals = await asyncio.gather(*[
+        aretrieve_documents(questions[i], k, vectors[i])
+        for i in pending
+    ])
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def answer_item(i: int, retrieved: dict):
+        if "response" in retrieved:
+            return i, retrieved["response"]
+        async with semaphore:
+            # Own key namespace: interactive flights may resolve to an early {"response": ...} shape
+            result = await QUERY_FLIGHTS.do(
+                ("batch",) + query_flight_key(questions[i], k),
+                lambda: generate_answer(
+                    questions[i], k, retrieved["docs"], vectors[i], corpus_version, scores=retrieved["scores"]
+                )
+            )
+        return i, result
+
+    for finished in asyncio.as_completed([answer_item(i, r) for i, r in zip(pending, retrievals)]):
+        yield await finished
+
+def parse_batch_body(body: dict) -> tuple:
+    """Validate a batch request body; returns (questions, k)"""
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Body must be a JSON object")
+    questions = body.get("questions")
+    if not isinstance(questions, list) or not questions:
+        raise HTTPException(status_code=400, detail="'questions' must be a non-empty list")
+    if any(not isinstance(q, str) for q in questions):
+        raise HTTPException(status_code=400, detail="Questions must be strings")
+    questions = [q.strip() for q in questions]
+    if any(not q for q in questions):
+        raise HTTPException(status_code=400, detail="Questions must not be empty")
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUESTIONS} questions per batch")
+    return questions, clamp_k(body.get("k", 1))
+
 # =======================
 # CHATBOT QUERY ROUTES
 # =======================
@@ -577,6 +1200,8 @@ async def api_query_rag(
             raise HTTPException(status_code=400, detail="Missing 'q' parameter")
         
         user_id = current_user.get("_id")
+        if wants_event_stream(request):
+            return sse_response(stream_query_rag_internal(q, k, user_id=user_id, chat_id=chat_id))
         result = await query_rag_internal(q, k, user_id=user_id, chat_id=chat_id)
         return JSONResponse(result)
     
@@ -584,6 +1209,63 @@ async def api_query_rag(
         print(f"❌ API query error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/query/stream")
+async def api_query_rag_stream(
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """Streaming API query endpoint (Server-Sent Events) - requires authentication"""
+    body = await request.json()
+    q = body.get("q")
+    k = int(body.get("k", 1))
+    chat_id = body.get("chat_id")
+    if not q:
+        raise HTTPException(status_code=400, detail="Missing 'q' parameter")
+    
+    user_id = current_user.get("_id")
+    return sse_response(stream_query_rag_internal(q, k, user_id=user_id, chat_id=chat_id))
+
+@app.post("/api/query/batch")
+async def api_query_rag_batch(
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Batch query endpoint - requires authentication
+    Body: {"questions": [...], "k": 1}; quota for the whole batch is charged up front or not at all.
+    Send Accept: text/event-stream to receive each item as it finishes.
+    """
+    try:
+        body = await request.json()
+    except ValueError:  # json.JSONDecodeError, or a body that is not valid UTF-8
+        raise HTTPException(status_code=400, detail="Body must be valid JSON")
+    questions, k = parse_batch_body(body)
+    user_id = str(current_user.get("_id"))
+
+    if VECTOR_STORE is None:
+        raise HTTPException(status_code=503, detail="Knowledge base not initialized.")
+
+    limit_info = await reserve_authenticated_queries(user_id, len(questions))
+    if not limit_info["allowed"]:
+        return JSONResponse({"limit_exceeded": True, "limit_info": limit_info, "results": []}, status_code=429)
+
+    if wants_event_stream(request):
+        async def events():
+            try:
+                async for i, result in batch_query_items(questions, k):
+                    yield format_sse("item", {"index": i, "question": questions[i], **result})
+                yield format_sse("done", {"count": len(questions), "limit_info": limit_info})
+            except Exception as e:
+                print(f"❌ Batch stream error: {e}")
+                traceback.print_exc()
+                yield format_sse("error", {"detail": str(e)})
+        return sse_response(events())
+
+    results = [None] * len(questions)
+    async for i, result in batch_query_items(questions, k):
+        results[i] = {"question": questions[i], **result}
+    return JSONResponse({"results": results, "count": len(questions), "limit_info": limit_info})
+
 # =======================
 # PUBLIC QUERY ROUTES
 # =======================
@@ -611,6 +1293,8 @@ async def api_query_rag_public(request: Request):
         
         ip_address = get_client_ip(request)
         print(f"🌐 Public API query from IP: {ip_address}")
+        if wants_event_stream(request):
+            return sse_response(stream_query_rag_internal(q, k, ip_address=ip_address))
         result = await query_rag_internal(q, k, ip_address=ip_address)
         return JSONResponse(result)
     
@@ -618,6 +1302,19 @@ async def api_query_rag_public(request: Request):
         print(f"❌ API query error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/query/public/stream")
+async def api_query_rag_public_stream(request: Request):
+    """Public streaming API query endpoint (Server-Sent Events) - no authentication required"""
+    body = await request.json()
+    q = body.get("q")
+    k = int(body.get("k", 1))
+    if not q:
+        raise HTTPException(status_code=400, detail="Missing 'q' parameter")
+    
+    ip_address = get_client_ip(request)
+    print(f"🌐 Public streaming query from IP: {ip_address}")
+    return sse_response(stream_query_rag_internal(q, k, ip_address=ip_address))
+
 # =======================
 # ENHANCED CHAT MANAGEMENT ROUTES
 # =======================
@@ -754,10 +1451,23 @@ def verify_api_key(x_api_key: Optional[str] = Header(None)):
         raise HTTPException(status_code=401, detail="Invalid API key")
     return True
 
+def create_payload_indexes(client: QdrantClient):
+    """Keyword payload indexes on the chunk metadata used for filtered retrieval"""
+    for field in PAYLOAD_INDEX_FIELDS:
+        try:
+            client.create_payload_index(
+                collection_name=QDRANT_COLLECTION,
+                field_name=f"metadata.{field}",
+                field_schema=models.PayloadSchemaType.KEYWORD,
+            )
+        except Exception as index_error:
+            print(f"⚠️ Payload index on metadata.{field} not created: {index_error}")
+    print(f"🗂️ Qdrant payload indexes: {', '.join(PAYLOAD_INDEX_FIELDS)}")
+
 @app.post("/ingest_local", dependencies=[Depends(verify_api_key)])
 async def ingest_local(use_qdrant: bool = True):
     """Ingest Markdown files - admin only"""
-    global VECTOR_STORE
+    global VECTOR_STORE, BM25_INDEX, CORPUS_VERSION
 
     folder_path = Path("data")
     md_files = list(folder_path.glob("*.md"))
@@ -773,20 +1483,50 @@ async def ingest_local(use_qdrant: bool = True):
         all_docs.extend(docs)
         print(f"   ✅ {md_file.name}: {len(docs)} chunks")
 
+    store_types = []
     if use_qdrant and QDRANT_URL and QDRANT_API_KEY:
-        VECTOR_STORE = QdrantVectorStore.from_documents(
+        # Embedding the whole corpus takes a while; keep serving other requests meanwhile
+        VECTOR_STORE = await asyncio.to_thread(
+            QdrantVectorStore.from_documents,
             documents=all_docs,
             embedding=embeddings,
             url=QDRANT_URL,
             api_key=QDRANT_API_KEY,
             collection_name=QDRANT_COLLECTION,
         )
-        store_type = "Qdrant"
+        await asyncio.to_thread(create_payload_indexes, VECTOR_STORE.client)
+        store_types.append("Qdrant")
     else:
         print("⚠️ Qdrant config missing, skipping Qdrant ingestion.")
         # VECTOR_STORE = create_pinecone_vectorstore(all_docs, PINECONE_KEY, PINECONE_INDEX)
         # store_type = "Pinecone"
 
+    if use_numpy_index(len(all_docs)):
+        numpy_store = await asyncio.to_thread(NumpyVectorStore.from_documents, all_docs, embeddings)
+        await asyncio.to_thread(numpy_store.save, NUMPY_INDEX_PATH)
+        VECTOR_STORE = numpy_store
+        store_types.append("NumPy (in-process)")
+
+    if not store_types:
+        raise HTTPException(status_code=400, detail="No vector store configured for this corpus size")
+
+    BM25_INDEX = BM25Index(all_docs)
+    BM25_INDEX.save(BM25_INDEX_PATH)
+
+    # Off-topic gate centroids (reusing the NumPy index vectors when there is one)
+    if isinstance(VECTOR_STORE, NumpyVectorStore):
+        chunk_vectors = VECTOR_STORE.vectors
+    else:
+        chunk_vectors = await asyncio.to_thread(embeddings.embed_documents, [doc.page_content for doc in all_docs])
+    DOMAIN_GATE.fit(chunk_vectors, all_docs)
+    DOMAIN_GATE.save(DOMAIN_CENTROIDS_PATH)
+
+    store_type = " + ".join(store_types)
+    CORPUS_VERSION = corpus_fingerprint(doc.page_content for doc in all_docs)
+    SEMANTIC_CACHE.clear()
+    await asyncio.to_thread(EXACT_CACHE.clear)
+    await asyncio.to_thread(EXACT_CACHE.set_corpus_version, CORPUS_VERSION)
+
     print(f"✅ Ingested {len(all_docs)} docs into {store_type}")
     
     return {
@@ -805,7 +1545,24 @@ async def health():
         "status": "ok",
         "backend": "Enhanced Chatbot v4.0 with Chat History",
         "vectorstore_loaded": VECTOR_STORE is not None,
+        "vectorstore_type": type(VECTOR_STORE).__name__ if VECTOR_STORE is not None else None,
+        "hybrid_search": HYBRID_SEARCH_ENABLED and BM25_INDEX is not None,
+        "adaptive_k": ADAPTIVE_K_STATS.snapshot(),
+        "intent_routing": INTENT_ROUTER.snapshot(),
+        "domain_gate": DOMAIN_GATE.snapshot(),
         "api_keys_available": len(GEMINI_API_KEY_LIST),
+        "api_key_health": KEY_SCHEDULER.snapshot(),
+        "api_key_pacing": KEY_PACER.snapshot(),
+        "llm_hedging": HEDGE_STATS.snapshot(),
+        "generation_providers": GENERATION.snapshot(),
+        "query_routing": QUERY_ROUTER.snapshot(),
+        "query_coalescing": QUERY_FLIGHTS.snapshot(),
+        "corpus_version": CORPUS_VERSION,
+        "exact_cache": await exact_cache_call(EXACT_CACHE.snapshot),
+        "semantic_cache": SEMANTIC_CACHE.snapshot(),
+        "embedding_backend": EMBEDDING_BACKEND,
+        "embedding_cache": embeddings.snapshot(),
+        "embedding_batching": EMBEDDING_BATCHER.snapshot() if EMBEDDING_BATCHER else {"enabled": False},
         "query_limits": {
             "authenticated": AUTHENTICATED_QUERY_LIMIT,
             "public": UNAUTHENTICATED_QUERY_LIMIT,
@@ -826,7 +1583,8 @@ async def root():
             "📅 Date-based chat categorization",
             "📌 Pin/Archive chats",
             "🔍 Search functionality",
-            "⚡ Query rate limiting"
+            "⚡ Query rate limiting",
+            "📡 Token streaming via Server-Sent Events"
         ],
         "query_limits": {
             "authenticated_users": f"{AUTHENTICATED_QUERY_LIMIT} queries per day",
@@ -843,7 +1601,10 @@ async def root():
                 "query_authenticated": "POST /query (requires auth + chat_id)",
                 "api_query_authenticated": "POST /api/query (requires auth + chat_id)",
                 "query_public": "POST /query/public (no auth, 3 queries/day)",
-                "api_query_public": "POST /api/query/public (no auth, 3 queries/day)"
+                "api_query_public": "POST /api/query/public (no auth, 3 queries/day)",
+                "stream_authenticated": "POST /api/query/stream (SSE: sources, token, done)",
+                "stream_public": "POST /api/query/public/stream (SSE: sources, token, done)",
+                "batch_authenticated": "POST /api/query/batch (requires auth, {questions: [...]})"
             },
             "chats": {
                 "create": "POST /chats/create",
@@ -0,0 +1,230 @@
+"""
+Embedding Backend Benchmark
+Parity check of the quantized ONNX backend against the PyTorch vectors,
+per-query latency / memory for each backend (each measured in a fresh process)
+and the throughput gain of micro-batching concurrent query embeddings.
+
+Usage: python bench_embeddings.py export                 (one-off ONNX export + int8 quantization)
+       python bench_embeddings.py parity --min-cosine 0.98
+       python bench_embeddings.py bench --queries 200
+       python bench_embeddings.py batching --concurrency 32 --max-wait-ms 5 --max-batch 32
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+SAMPLE_QUESTIONS = [
+    "Who is Kashaf Naveed?",
+    "What is her education?",
+    "Which programming languages does she know?",
+    "Tell me about the AI chatbot dashboard project",
+    "How many years of experience does she have?",
+    "What is her work philosophy?",
+    "Does she know FastAPI and React?",
+    "What are her future goals?",
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare embedding backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("export", help="Export and quantize the ONNX model")
+
+    parity = sub.add_parser("parity", help="Cosine agreement of ONNX vs torch vectors")
+    parity.add_argument("--min-cosine", type=float, default=0.98)
+    parity.add_argument("--fp32", action="store_true", help="Check the unquantized export instead")
+
+    bench = sub.add_parser("bench", help="Per-query latency and memory for each backend")
+    bench.add_argument("--queries", type=int, default=200)
+    bench.add_argument("--backends", default="torch,onnx")
+    bench.add_argument("--child", help=argparse.SUPPRESS)
+
+    batching = sub.add_parser("batching", help="Concurrent query throughput with and without micro-batching")
+    batching.add_argument("--backend", default=os.getenv("EMBEDDING_BACKEND", "torch"))
+    batching.add_argument("--queries", type=int, default=256)
+    batching.add_argument("--concurrency", type=int, default=32)
+    batching.add_argument("--max-batch", type=int, default=32)
+    batching.add_argument("--max-wait-ms", type=float, default=5)
+    return parser.parse_args()
+
+def corpus_texts() -> list:
+    """Knowledge-base paragraphs plus sample questions"""
+    texts = []
+    for md_file in sorted(Path("data").glob("*.md")):
+        paragraphs = md_file.read_text(encoding="utf-8").split("\n\n")
+        texts.extend(p.strip() for p in paragraphs if len(p.strip()) > 30)
+    return texts + SAMPLE_QUESTIONS
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+def parity_report(torch_vectors, onnx_vectors, questions: int = len(SAMPLE_QUESTIONS)) -> dict:
+    """
+    Per-text cosine of two backends' vectors, plus whether the last `questions`
+    rows (the sample questions) retrieve the same nearest chunk with both
+    """
+    torch_vectors = np.asarray(torch_vectors, dtype=np.float32)
+    onnx_vectors = np.asarray(onnx_vectors, dtype=np.float32)
+    torch_vectors = torch_vectors / np.linalg.norm(torch_vectors, axis=1, keepdims=True)
+    onnx_vectors = onnx_vectors / np.linalg.norm(onnx_vectors, axis=1, keepdims=True)
+    cosine = (torch_vectors * onnx_vectors).sum(axis=1)
+
+    chunks_torch, chunks_onnx = torch_vectors[:-questions], onnx_vectors[:-questions]
+    top_torch = (torch_vectors[-questions:] @ chunks_torch.T).argmax(axis=1)
+    top_onnx = (onnx_vectors[-questions:] @ chunks_onnx.T).argmax(axis=1)
+    return {
+        "cosine": cosine,
+        "top_torch": top_torch,
+        "top_onnx": top_onnx,
+        "agreement": float((top_torch == top_onnx).mean()),
+    }
+
+def rss_mb() -> float:
+    """Peak resident set size of this process (Linux reports KB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# =======================
+# Commands
+# =======================
+def run_export():
+    from embedding_backends import export_onnx_model
+    export_onnx_model()
+
+def run_parity(args):
+    from embedding_backends import OnnxEmbeddings, build_embeddings
+
+    texts = corpus_texts()
+    report = parity_report(
+        build_embeddings("torch").embed_documents(texts),
+        OnnxEmbeddings(quantized=not args.fp32).embed_documents(texts),
+    )
+    cosine, agreement = report["cosine"], report["agreement"]
+
+    print("=" * 60)
+    print(f"🔬 {len(texts)} texts, {'fp32' if args.fp32 else 'int8'} ONNX vs torch")
+    print(f"   cosine min {cosine.min():.4f}  mean {cosine.mean():.4f}")
+    print(f"   top-1 retrieval agreement: {agreement:.0%}")
+    print("=" * 60)
+
+    if cosine.min() < args.min_cosine:
+        print(f"❌ Parity check failed: min cosine below {args.min_cosine}")
+        sys.exit(1)
+    print("✅ Parity check passed")
+
+def run_bench_child(backend: str, queries: int):
+    """Measure one backend in this process and print JSON"""
+    from embedding_backends import build_embeddings
+
+    baseline = rss_mb()
+    started = time.perf_counter()
+    model = build_embeddings(backend)
+    model.embed_query("warm up")
+    load_seconds = time.perf_counter() - started
+
+    latencies = []
+    for i in range(queries):
+        question = f"{SAMPLE_QUESTIONS[i % len(SAMPLE_QUESTIONS)]} ({i})"  # defeat any caching
+        started = time.perf_counter()
+        model.embed_query(question)
+        latencies.append(time.perf_counter() - started)
+
+    print(json.dumps({
+        "backend": backend,
+        "load_s": round(load_seconds, 2),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "peak_rss_mb": round(rss_mb(), 1),
+        "model_rss_mb": round(rss_mb() - baseline, 1),
+    }))
+
+def run_bench(args):
+    results = []
+    for backend in filter(None, args.backends.split(",")):
+        output = subprocess.run(
+            [sys.executable, __file__, "bench", "--child", backend, "--queries", str(args.queries)],
+            capture_output=True, text=True, env=os.environ.copy()
+        )
+        lines = [line for line in output.stdout.splitlines() if line.startswith("{")]
+        if output.returncode != 0 or not lines:
+            print(f"❌ {backend} failed:\n{output.stderr[-1000:]}")
+            continue
+        results.append(json.loads(lines[-1]))
+
+    print("=" * 60)
+    print(f"{'backend':<10}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'peak RSS MB':>13}{'model MB':>10}")
+    for r in results:
+        print(f"{r['backend']:<10}{r['load_s']:>8}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['peak_rss_mb']:>13}{r['model_rss_mb']:>10}")
+    print("=" * 60)
+
+async def measure_concurrent(embed, queries: int, concurrency: int) -> dict:
+    """Fire `queries` embeddings with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await embed(f"{SAMPLE_QUESTIONS[i % len(SAMPLE_QUESTIONS)]} ({i})")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(queries)])
+    elapsed = time.perf_counter() - started
+    return {
+        "qps": queries / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+
+def run_batching(args):
+    from concurrent.futures import ThreadPoolExecutor
+    from embedding_backends import build_embeddings
+    from embedding_batcher import EmbeddingBatcher
+
+    model = build_embeddings(args.backend)
+    model.embed_query("warm up")
+    executor = ThreadPoolExecutor(max_workers=args.concurrency)
+    batcher = EmbeddingBatcher(model, max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+
+    async def unbatched(text):
+        return await asyncio.get_running_loop().run_in_executor(executor, model.embed_query, text)
+
+    async def main():
+        return (
+            await measure_concurrent(unbatched, args.queries, args.concurrency),
+            await measure_concurrent(batcher.aembed_query, args.queries, args.concurrency),
+        )
+
+    single, batched = asyncio.run(main())
+    stats = batcher.snapshot()
+
+    print("=" * 60)
+    print(f"🚀 {args.queries} queries, concurrency {args.concurrency}, backend {args.backend}")
+    print(f"{'mode':<12}{'queries/s':>11}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, r in (("unbatched", single), ("batched", batched)):
+        print(f"{name:<12}{r['qps']:>11.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}")
+    print(f"📈 Throughput gain: {batched['qps'] / single['qps']:.2f}x "
+          f"(avg batch {stats['avg_batch_size']}, max {stats['max_seen_batch']})")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    if arguments.command == "export":
+        run_export()
+    elif arguments.command == "parity":
+        run_parity(arguments)
+    elif arguments.command == "batching":
+        run_batching(arguments)
+    elif arguments.child:
+        run_bench_child(arguments.child, arguments.queries)
+    else:
+        run_bench(arguments)
@@ -0,0 +1,99 @@
+"""
+LLM Call Path Benchmark
+Drives the real key rotation (scheduler, pacer, hedging, failover) against the
+fake Gemini provider and reports throughput, latency percentiles and key health.
+
+Usage: python bench_llm.py --requests 200 --concurrency 50 --keys 4
+       FAKE_GEMINI_ERRORS="fake-key-1:429:0.5" FAKE_GEMINI_SLOW_KEYS="fake-key-2:4" python bench_llm.py
+       python bench_llm.py --stream
+       python bench_llm.py --providers gemini,extractive   (through the provider chain)
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+from types import SimpleNamespace
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the Gemini call path offline")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--keys", type=int, default=4, help="Number of fake API keys")
+    parser.add_argument("--rpm", type=float, default=100000, help="Per-key RPM given to the pacer")
+    parser.add_argument("--stream", action="store_true", help="Use the streaming path (time to first token)")
+    parser.add_argument("--providers", default="", help="Generation provider order to compare, e.g. local or gemini,extractive")
+    return parser.parse_args()
+
+def configure_env(args):
+    """Point the LLM service at the fake provider before it is imported"""
+    os.environ.setdefault("GEMINI_FAKE_PROVIDER", "inprocess")
+    os.environ.setdefault("FAKE_GEMINI_SEED", "42")
+    os.environ["GEMINI_API_KEYS"] = ",".join(f"fake-key-{i + 1}" for i in range(args.keys))
+    os.environ["GEMINI_KEY_RPM"] = str(args.rpm)
+    if args.providers:
+        os.environ["GENERATION_PROVIDERS"] = args.providers
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+async def run(args):
+    from llm_service import (
+        try_all_keys_for_genai_call, try_all_keys_for_genai_stream,
+        KEY_SCHEDULER, KEY_PACER, HEDGE_STATS
+    )
+    from gemini_client import close_http_client
+    from providers import build_provider_chain
+
+    chain = build_provider_chain() if args.providers else None
+    docs = [SimpleNamespace(page_content="Kashaf Naveed is a MERN + AI developer. She builds RAG chatbots with FastAPI.")]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, failures = [], []
+    prompt = "Context:\nKashaf Naveed is a MERN + AI developer.\n\nQuestion: Who is Kashaf?\n\nAnswer:"
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if chain and args.stream:
+                    async for _ in chain.stream("Who is Kashaf?", prompt, docs):
+                        break
+                elif chain:
+                    await chain.generate("Who is Kashaf?", prompt, docs)
+                elif args.stream:
+                    async for _ in try_all_keys_for_genai_stream(prompt):
+                        break  # time to first token
+                else:
+                    await try_all_keys_for_genai_call(prompt)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                failures.append(str(e)[:100])
+
+    print(f"🚀 {args.requests} requests, concurrency {args.concurrency}, {args.keys} keys"
+          f"{' (streaming)' if args.stream else ''}")
+    started = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(args.requests)])
+    elapsed = time.perf_counter() - started
+    await close_http_client()
+
+    print("=" * 60)
+    print(f"⏱️  Wall time: {elapsed:.2f}s  |  Throughput: {len(latencies) / elapsed:.1f} req/s")
+    print(f"✅ Succeeded: {len(latencies)}  ❌ Failed: {len(failures)}")
+    for p in (0.5, 0.9, 0.95, 0.99):
+        print(f"   p{int(p * 100)}: {percentile(latencies, p) * 1000:.0f} ms")
+    if failures:
+        print(f"   First failure: {failures[0]}")
+    print("🔑 Key health:")
+    print(json.dumps(KEY_SCHEDULER.snapshot(), indent=2))
+    print("⏳ Pacing:", json.dumps({k: v for k, v in KEY_PACER.snapshot().items() if k != "keys"}))
+    print("🪝 Hedging:", json.dumps(HEDGE_STATS.snapshot()))
+    if chain:
+        print("🧠 Providers:", json.dumps(chain.snapshot(), indent=2))
+    print("=" * 60)
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    configure_env(arguments)
+    asyncio.run(run(arguments))
@@ -0,0 +1,125 @@
+"""
+Retrieval Benchmark
+Recall@k and per-query latency of dense, BM25 and hybrid (RRF-fused) retrieval
+over the knowledge base. A chunk counts as relevant when it contains the
+expected answer text, so labels survive re-chunking.
+
+Usage: python bench_retrieval.py --k 1,3,5
+       python bench_retrieval.py --backend onnx --candidates 20
+       python bench_retrieval.py --retrievers bm25          (no embedding model needed)
+"""
+
+import os
+import time
+import argparse
+from pathlib import Path
+
+# (question, text the relevant chunk must contain)
+LABELED_QUESTIONS = [
+    ("HubSpot", "HubSpot"),
+    ("Which CRM did she automate?", "HubSpot"),
+    ("FLAN-T5", "FLAN-T5"),
+    ("What model powers the multilingual project?", "FLAN-T5"),
+    ("MediaPipe", "MediaPipe"),
+    ("Which libraries are used in the Try-On Spectacles system?", "MediaPipe"),
+    ("What is her CGPA?", "CGPA: 3.4"),
+    ("BSCS duration", "BSCS program"),
+    ("Has she used VAEs?", "VAEs are used"),
+    ("WebSockets experience", "WebSockets"),
+    ("What is the AI Chatbot project?", "personal-assistant system"),
+    ("Which vector databases does the chatbot use?", "Pinecone or Qdrant"),
+    ("Where does Kashaf study?", "Bachelor of Science in Computer Science"),
+    ("What is her work philosophy?", "philosophy"),
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare dense, BM25 and hybrid retrieval")
+    parser.add_argument("--k", default="1,3,5", help="Comma-separated cut-offs")
+    parser.add_argument("--backend", default=os.getenv("EMBEDDING_BACKEND", "torch"))
+    parser.add_argument("--candidates", type=int, default=None, help="Per-retriever candidates before fusion")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes over the question set")
+    parser.add_argument("--retrievers", default="dense,bm25,hybrid", help="Comma-separated subset to run")
+    return parser.parse_args()
+
+def load_chunks() -> list:
+    from rag_utils import load_md_to_chunks
+
+    docs = []
+    for md_file in sorted(Path("data").glob("*.md")):
+        docs.extend(load_md_to_chunks(str(md_file)))
+    return docs
+
+def first_hit(docs: list, expected: str) -> int:
+    """1-based rank of the first relevant chunk, 0 when none is retrieved"""
+    for rank, doc in enumerate(docs, start=1):
+        if expected.lower() in doc.page_content.lower():
+            return rank
+    return 0
+
+def main(args):
+    from bm25_index import BM25Index, HYBRID_CANDIDATES, reciprocal_rank_fusion
+
+    cutoffs = sorted(int(k) for k in args.k.split(","))
+    max_k = cutoffs[-1]
+    candidates = max(args.candidates or HYBRID_CANDIDATES, max_k)
+    selected = [name for name in args.retrievers.split(",") if name]
+
+    chunks = load_chunks()
+    bm25 = BM25Index(chunks)
+    if {"dense", "hybrid"} & set(selected):
+        from embedding_backends import build_embeddings
+        from numpy_store import NumpyVectorStore
+
+        embeddings = build_embeddings(args.backend)
+        store = NumpyVectorStore.from_documents(chunks, embeddings)
+        vectors = {q: embeddings.embed_query(q) for q, _ in LABELED_QUESTIONS}
+
+    def dense(q):
+        return [doc for doc, _ in store.similarity_search_with_score_by_vector(vectors[q], k=max_k)]
+
+    def lexical(q):
+        return [doc for doc, _ in bm25.search(q, max_k)]
+
+    def hybrid(q):
+        fused = reciprocal_rank_fusion([
+            store.similarity_search_with_score_by_vector(vectors[q], k=candidates),
+            bm25.search(q, candidates),
+        ])
+        return [doc for doc, _ in fused[:max_k]]
+
+    print("=" * 60)
+    backend = args.backend if {"dense", "hybrid"} & set(selected) else "none"
+    print(f"📚 {len(chunks)} chunks, {len(LABELED_QUESTIONS)} labeled questions, backend {backend}")
+    print("   (query embeddings precomputed; latency is search time only)")
+    header = "".join(f"{f'R@{k}':>8}" for k in cutoffs)
+    print(f"{'retriever':<10}{header}{'p50 ms':>9}{'p95 ms':>9}")
+
+    misses = {}
+    retrievers = {"dense": dense, "bm25": lexical, "hybrid": hybrid}
+    for name in selected:
+        search = retrievers[name]
+        ranks = [first_hit(search(q), expected) for q, expected in LABELED_QUESTIONS]
+        recall = "".join(
+            f"{sum(1 for r in ranks if 0 < r <= k) / len(ranks):>8.2f}" for k in cutoffs
+        )
+
+        latencies = []
+        for _ in range(args.repeat):
+            for q, _ in LABELED_QUESTIONS:
+                started = time.perf_counter()
+                search(q)
+                latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000
+
+        print(f"{name:<10}{recall}{p50:>9.2f}{p95:>9.2f}")
+        misses[name] = [q for (q, _), r in zip(LABELED_QUESTIONS, ranks) if r != 1]
+
+    print("-" * 60)
+    for name, questions in misses.items():
+        print(f"❌ {name} top-1 misses: {', '.join(questions) if questions else 'none'}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main(parse_args())
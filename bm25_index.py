@@ -0,0 +1,119 @@
+"""
+BM25 Keyword Index
+In-memory inverted index over the knowledge-base chunks, fused with dense
+vector results by reciprocal rank fusion so exact terms (product names,
+acronyms) are found even when the embedding misses them
+"""
+
+import os
+import re
+import json
+import math
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from context_builder import chunk_key
+from numpy_store import matches_filter
+
+# =======================
+# Configuration
+# =======================
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "10"))  # per retriever, before fusion
+RRF_K = int(os.getenv("RRF_K", "60"))
+BM25_INDEX_PATH = Path(os.getenv("BM25_INDEX_PATH", "local_index/bm25.json"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "does", "for", "from",
+    "has", "have", "her", "his", "how", "i", "in", "is", "it", "me", "my", "of", "on",
+    "or", "she", "tell", "the", "to", "was", "what", "which", "who", "with", "you", "your",
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+# =======================
+# Index
+# =======================
+class BM25Index:
+    """Okapi BM25 over a fixed list of chunks"""
+
+    def __init__(self, documents: List[Document]):
+        self.documents = documents
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+
+        for i, doc in enumerate(documents):
+            counts = Counter(tokenize(doc.page_content))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((i, tf))
+
+        total = len(documents)
+        self.avg_length = sum(self.doc_lengths) / total if total else 0.0
+        self.idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query: str, k: int = HYBRID_CANDIDATES, filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        """Top-k chunks by BM25 score (chunks sharing no term or failing the metadata filter are not returned)"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self.postings[term]:
+                if filter and not matches_filter(self.documents[i].metadata, filter):
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[i] / self.avg_length)
+                scores[i] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        top = sorted(scores.items(), key=lambda item: -item[1])[:k]
+        return [(self.documents[i], score) for i, score in top]
+
+    def save(self, path: Path = BM25_INDEX_PATH):
+        """Persist the chunks; postings are rebuilt on load (milliseconds for this corpus)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in self.documents]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, default=str)
+        print(f"💾 Saved BM25 index ({len(self.documents)} chunks) to {path}")
+
+    @classmethod
+    def load(cls, path: Path = BM25_INDEX_PATH) -> Optional["BM25Index"]:
+        """Load a saved index, or None if there is none"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        return cls([Document(page_content=item["page_content"], metadata=item["metadata"]) for item in payload])
+
+# =======================
+# Fusion
+# =======================
+def reciprocal_rank_fusion(result_lists: List[List[Tuple[Document, float]]], rrf_k: int = RRF_K) -> List[Tuple[Document, float]]:
+    """
+    Merge ranked (doc, score) lists by summing 1 / (rrf_k + rank)
+    Chunks are matched across retrievers by (filename, chunk_no)
+    """
+    fused: Dict[tuple, float] = defaultdict(float)
+    first_seen: Dict[tuple, Document] = {}
+    for results in result_lists:
+        for rank, (doc, _) in enumerate(results, start=1):
+            key = chunk_key(doc)
+            fused[key] += 1 / (rrf_k + rank)
+            first_seen.setdefault(key, doc)
+    return [(first_seen[key], score) for key, score in sorted(fused.items(), key=lambda item: -item[1])]
@@ -0,0 +1,100 @@
+"""
+Token-Budgeted Context Assembly
+Packs the highest-ranked chunks into a token budget, trims the overlap the
+splitter leaves between adjacent chunks and sizes the output-token cap
+from the requested answer length
+"""
+
+import os
+from typing import List, Tuple
+
+from rate_limiter import CHARS_PER_TOKEN
+
+# =======================
+# Configuration
+# =======================
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+ANSWER_SENTENCES = int(os.getenv("ANSWER_SENTENCES", "4"))
+TOKENS_PER_SENTENCE = int(os.getenv("TOKENS_PER_SENTENCE", "40"))
+ANSWER_TOKEN_MARGIN = int(os.getenv("ANSWER_TOKEN_MARGIN", "64"))
+
+# Overlap lengths to look for (splitter uses chunk_overlap=100)
+MIN_CHUNK_OVERLAP_CHARS = 10
+MAX_CHUNK_OVERLAP_CHARS = 200
+CHUNK_SEPARATOR = "\n\n"
+
+# =======================
+# Helper Functions
+# =======================
+def count_tokens(text: str) -> int:
+    """Approximate token count (same ratio the pacer uses)"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def overlap_size(previous: str, current: str, max_overlap: int = MAX_CHUNK_OVERLAP_CHARS) -> int:
+    """Length of the longest tail of `previous` that `current` starts with"""
+    limit = min(len(previous), len(current), max_overlap)
+    for size in range(limit, MIN_CHUNK_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(current[:size]):
+            return size
+    return 0
+
+def strip_overlap(previous: str, current: str) -> str:
+    """Remove the prefix of `current` that repeats the tail of `previous`"""
+    return current[overlap_size(previous, current):].lstrip()
+
+def answer_token_cap(sentences: int = ANSWER_SENTENCES) -> int:
+    """Output-token cap for an answer of the requested length"""
+    return sentences * TOKENS_PER_SENTENCE + ANSWER_TOKEN_MARGIN
+
+def chunk_key(doc) -> Tuple[str, int]:
+    """(filename, chunk_no) identifying a chunk's position in its file"""
+    return doc.metadata.get("filename", ""), doc.metadata.get("chunk_no", -1)
+
+# =======================
+# Context Builder
+# =======================
+def build_context(docs: list, budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[str, List]:
+    """
+    Pack docs (highest-ranked first) into the token budget
+    Returns the context string and the docs actually used
+    """
+    by_position = {chunk_key(doc): doc for doc in docs}
+    parts: List[str] = []
+    used: List = []
+    used_ids = set()
+    remaining = budget
+
+    for doc in docs:
+        text = doc.page_content.strip()
+
+        # Adjacent chunks share up to chunk_overlap chars; keep them only once
+        filename, chunk_no = chunk_key(doc)
+        previous = by_position.get((filename, chunk_no - 1))
+        if previous is not None and id(previous) in used_ids:
+            text = strip_overlap(previous.page_content.strip(), text)
+        following = by_position.get((filename, chunk_no + 1))
+        if following is not None and id(following) in used_ids:
+            overlap = overlap_size(text, following.page_content.strip())
+            text = text[:len(text) - overlap].rstrip()
+
+        if not text:
+            used.append(doc)
+            used_ids.add(id(doc))
+            continue
+
+        cost = count_tokens(text) + count_tokens(CHUNK_SEPARATOR)
+        if cost > remaining:
+            if not parts:
+                # Always keep the best chunk, trimmed to the budget
+                parts.append(text[:remaining * CHARS_PER_TOKEN])
+                used.append(doc)
+                used_ids.add(id(doc))
+                remaining = 0
+            continue
+
+        parts.append(text)
+        used.append(doc)
+        used_ids.add(id(doc))
+        remaining -= cost
+
+    return CHUNK_SEPARATOR.join(parts), used
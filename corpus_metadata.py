@@ -0,0 +1,62 @@
+"""
+Corpus Metadata
+Category / topic / tags for each knowledge-base file. Copied into every
+chunk's metadata at ingestion so retrieval can filter by topic.
+"""
+
+FILE_METADATA = {
+    "ai-expertise.md": {
+        "category": "expertise",
+        "topic": "artificial-intelligence",
+        "tags": ["AI", "machine-learning", "expertise"],
+        "importance": "high"
+    },
+    "education.md": {
+        "category": "background",
+        "topic": "education",
+        "tags": ["education", "academic", "qualifications"],
+        "importance": "high"
+    },
+    "experience.md": {
+        "category": "background",
+        "topic": "work-experience",
+        "tags": ["experience", "career", "professional"],
+        "importance": "high"
+    },
+    "identity.md": {
+        "category": "personal",
+        "topic": "identity",
+        "tags": ["identity", "personal", "introduction"],
+        "importance": "high"
+    },
+    "projects.md": {
+        "category": "portfolio",
+        "topic": "projects",
+        "tags": ["projects", "portfolio", "work"],
+        "importance": "high"
+    },
+    "skills.md": {
+        "category": "expertise",
+        "topic": "skills",
+        "tags": ["skills", "technical", "capabilities"],
+        "importance": "high"
+    },
+    "work-philosophy.md": {
+        "category": "personal",
+        "topic": "philosophy",
+        "tags": ["philosophy", "values", "approach"],
+        "importance": "medium"
+    }
+}
+
+DEFAULT_IMPORTANCE = "medium"
+# Qdrant payload indexes (keyword) created at ingestion; langchain stores metadata under "metadata."
+PAYLOAD_INDEX_FIELDS = ("category", "topic", "tags")
+
+def file_metadata(filename: str) -> dict:
+    """Metadata for a markdown file (files without an entry get a topic named after the file)"""
+    metadata = FILE_METADATA.get(filename)
+    if metadata is None:
+        stem = filename.replace(".md", "")
+        metadata = {"category": "general", "topic": stem, "tags": [stem], "importance": DEFAULT_IMPORTANCE}
+    return {**metadata, "tags": list(metadata["tags"])}
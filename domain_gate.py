@@ -0,0 +1,119 @@
+"""
+Domain Gate
+Cheap off-topic detection: the query embedding is compared with the corpus
+centroid and one centroid per topic (computed at ingestion). Questions far
+from all of them get a canned answer without retrieval, an LLM call or a
+charge to the caller's quota.
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+# =======================
+# Configuration
+# =======================
+DOMAIN_GATE_ENABLED = os.getenv("DOMAIN_GATE_ENABLED", "true").lower() == "true"
+DOMAIN_GATE_THRESHOLD = float(os.getenv("DOMAIN_GATE_THRESHOLD", "0.2"))  # max centroid cosine below this = off-topic
+DOMAIN_CENTROIDS_PATH = Path(os.getenv("DOMAIN_CENTROIDS_PATH", "local_index/centroids.npy"))
+OFF_TOPIC_ANSWER = os.getenv(
+    "OFF_TOPIC_ANSWER",
+    "I can only answer questions about Kashaf Naveed's background, education, skills, projects and experience."
+)
+
+CORPUS_LABEL = "corpus"
+
+# =======================
+# Gate
+# =======================
+class DomainGate:
+    """Max cosine similarity between a query and the corpus / topic centroids"""
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self.centroids: Optional[np.ndarray] = None
+        self.checked = 0
+        self.off_topic = 0
+        self.off_topic_similarity = 0.0
+        self.on_topic_similarity = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return DOMAIN_GATE_ENABLED and self.centroids is not None
+
+    def fit(self, vectors, documents: list, field: str = "topic"):
+        """Centroids of the chunk embeddings: one for the whole corpus, one per metadata field value"""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix = matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+
+        groups = {}
+        for i, doc in enumerate(documents):
+            groups.setdefault(doc.metadata.get(field, CORPUS_LABEL), []).append(i)
+
+        labels = [CORPUS_LABEL] + sorted(groups)
+        rows = [matrix.mean(axis=0)] + [matrix[groups[label]].mean(axis=0) for label in labels[1:]]
+        centroids = np.asarray(rows, dtype=np.float32)
+        self.centroids = centroids / np.clip(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12, None)
+        self.labels = labels
+        print(f"🎯 Domain gate fitted ({len(labels)} centroids)")
+
+    def similarity(self, query_vector) -> tuple:
+        """(best cosine, nearest centroid label)"""
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = self.centroids @ query
+        best = int(scores.argmax())
+        return float(scores[best]), self.labels[best]
+
+    def check(self, query_vector) -> dict:
+        """{"on_topic", "similarity", "nearest"}; always on-topic when the gate is not ready"""
+        if not self.ready:
+            return {"on_topic": True, "similarity": None, "nearest": None}
+        similarity, nearest = self.similarity(query_vector)
+        on_topic = similarity >= DOMAIN_GATE_THRESHOLD
+        self.checked += 1
+        if on_topic:
+            self.on_topic_similarity += similarity
+        else:
+            self.off_topic += 1
+            self.off_topic_similarity += similarity
+        return {"on_topic": on_topic, "similarity": round(similarity, 4), "nearest": nearest}
+
+    # =======================
+    # Persistence
+    # =======================
+    def save(self, path: Path = DOMAIN_CENTROIDS_PATH):
+        """Centroid matrix (.npy) plus its labels (.json alongside)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(path, self.centroids)
+        path.with_suffix(".json").write_text(json.dumps(self.labels), encoding="utf-8")
+        print(f"💾 Saved domain centroids to {path}")
+
+    def load(self, path: Path = DOMAIN_CENTROIDS_PATH) -> bool:
+        """Load saved centroids; False if there are none"""
+        path = Path(path)
+        labels_path = path.with_suffix(".json")
+        if not path.exists() or not labels_path.exists():
+            return False
+        self.centroids = np.load(path)
+        self.labels = json.loads(labels_path.read_text(encoding="utf-8"))
+        print(f"🎯 Loaded domain centroids ({len(self.labels)})")
+        return True
+
+    def snapshot(self) -> dict:
+        """Counters for the /health endpoint"""
+        on_topic = self.checked - self.off_topic
+        return {
+            "enabled": DOMAIN_GATE_ENABLED,
+            "ready": self.ready,
+            "threshold": DOMAIN_GATE_THRESHOLD,
+            "centroids": len(self.labels),
+            "checked": self.checked,
+            "off_topic": self.off_topic,
+            "avg_on_topic_similarity": round(self.on_topic_similarity / on_topic, 4) if on_topic else None,
+            "avg_off_topic_similarity": round(self.off_topic_similarity / self.off_topic, 4) if self.off_topic else None,
+        }
@@ -0,0 +1,135 @@
+"""
+Embedding Backends
+Selects how all-MiniLM-L6-v2 is run: PyTorch through sentence-transformers
+(default), an int8 dynamically quantized ONNX Runtime export, which needs
+far less memory and CPU per query, or the shared embedding sidecar process
+"""
+
+import os
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# =======================
+# Configuration
+# =======================
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch", "onnx" or "sidecar"
+ONNX_MODEL_DIR = Path(os.getenv("ONNX_MODEL_DIR", "onnx_models/all-MiniLM-L6-v2"))
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "true").lower() == "true"
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "1"))
+ONNX_MAX_SEQ_LENGTH = 256  # all-MiniLM-L6-v2 max_seq_length
+
+FP32_MODEL_FILE = "model.onnx"
+INT8_MODEL_FILE = "model.int8.onnx"
+
+# =======================
+# ONNX Export
+# =======================
+def onnx_model_file(model_dir: Path = ONNX_MODEL_DIR, quantized: bool = ONNX_QUANTIZE) -> Path:
+    return Path(model_dir) / (INT8_MODEL_FILE if quantized else FP32_MODEL_FILE)
+
+def export_onnx_model(model_name: str = EMBEDDING_MODEL, model_dir: Path = ONNX_MODEL_DIR) -> Path:
+    """
+    Export the transformer to ONNX and write an int8 dynamically quantized copy next to it
+    Needs torch + transformers + onnxruntime once; serving only needs onnxruntime + tokenizer files
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    model_dir = Path(model_dir)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    print(f"📦 Exporting {model_name} to ONNX in {model_dir}")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            str(model_dir / FP32_MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    tokenizer.save_pretrained(str(model_dir))
+
+    quantize_dynamic(
+        str(model_dir / FP32_MODEL_FILE),
+        str(model_dir / INT8_MODEL_FILE),
+        weight_type=QuantType.QInt8,
+    )
+    print(f"✅ ONNX export complete: {FP32_MODEL_FILE}, {INT8_MODEL_FILE}")
+    return model_dir
+
+# =======================
+# ONNX Runtime Embeddings
+# =======================
+class OnnxEmbeddings(Embeddings):
+    """Mean-pooled, L2-normalized sentence embeddings from an ONNX export (matches sentence-transformers output)"""
+
+    def __init__(self, model_dir: Path = ONNX_MODEL_DIR, quantized: bool = ONNX_QUANTIZE, threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_file = onnx_model_file(model_dir, quantized)
+        if not model_file.exists():
+            export_onnx_model(EMBEDDING_MODEL, model_dir)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(model_file), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        self.model_file = model_file
+        print(f"⚙️ ONNX embeddings loaded from {model_file} ({threads} threads)")
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=ONNX_MAX_SEQ_LENGTH,
+            return_tensors="np",
+        )
+        feeds = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+        hidden = self.session.run(None, feeds)[0]
+
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+# =======================
+# Factory
+# =======================
+def build_embeddings(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL) -> Embeddings:
+    """Create the configured embedding backend (heavy imports happen only for the one selected)"""
+    if backend == "onnx":
+        return OnnxEmbeddings()
+    if backend == "sidecar":
+        from embedding_sidecar import SidecarEmbeddings
+
+        return SidecarEmbeddings()
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=model_name)
@@ -0,0 +1,145 @@
+"""
+Embedding Micro-Batcher
+Collects concurrent query embeddings for a few milliseconds (or until the
+batch is full) and runs them through the model in one forward pass
+"""
+
+import os
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+# =======================
+# Configuration
+# =======================
+EMBEDDING_BATCHING_ENABLED = os.getenv("EMBEDDING_BATCHING_ENABLED", "true").lower() == "true"
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+EMBEDDING_BATCH_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_BATCH_TIMEOUT_SECONDS", "30"))  # blocking callers only
+
+class EmbeddingBatcher(Embeddings):
+    """
+    Embeddings wrapper that batches embed_query calls on a worker thread
+    Works for async callers (aembed_query) and for blocking callers on executor threads (embed_query)
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        max_batch_size: int = EMBEDDING_BATCH_MAX_SIZE,
+        max_wait_ms: float = EMBEDDING_BATCH_MAX_WAIT_MS
+    ):
+        self.underlying = underlying
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.pending: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.max_seen_batch = 0
+        self.cancelled = 0
+        self.total_forward_seconds = 0.0
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._start_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                    self._worker.start()
+
+    def _collect(self) -> list:
+        """Block for the first request, then gather more until the batch is full or max_wait passes"""
+        batch = []
+        self._accept(batch, self.pending.get())
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                self._accept(batch, self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _accept(self, batch: list, item: tuple):
+        """Add a queued request unless its caller already cancelled it (a running future can no longer be cancelled)"""
+        _, future = item
+        if future.set_running_or_notify_cancel():
+            batch.append(item)
+        else:
+            self.cancelled += 1
+
+    def _run(self):
+        # Nothing may end this thread: every later query would wait on it forever
+        while True:
+            batch = []
+            try:
+                batch = self._collect()
+                if batch:
+                    self._embed_batch(batch)
+            except Exception as e:
+                print(f"❌ Embedding batcher error: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _embed_batch(self, batch: list):
+        texts = [text for text, _ in batch]
+        started = time.monotonic()
+        try:
+            vectors = self.underlying.embed_documents(texts)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.total_forward_seconds += time.monotonic() - started
+        self.batches += 1
+        self.items += len(batch)
+        self.max_seen_batch = max(self.max_seen_batch, len(batch))
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+    def submit(self, text: str) -> Future:
+        """Queue one query for the next batch"""
+        self._ensure_worker()
+        future: Future = Future()
+        self.pending.put((text, future))
+        return future
+
+    def embed_query(self, text: str) -> List[float]:
+        future = self.submit(text)
+        try:
+            return future.result(timeout=EMBEDDING_BATCH_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Already a batch; goes straight to the model"""
+        return self.underlying.embed_documents(texts)
+
+    def snapshot(self) -> dict:
+        """Counters for the /health endpoint"""
+        return {
+            "enabled": EMBEDDING_BATCHING_ENABLED,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_seen_batch": self.max_seen_batch,
+            "cancelled": self.cancelled,
+            "avg_forward_ms": round(self.total_forward_seconds / self.batches * 1000, 2) if self.batches else None,
+            "queued": self.pending.qsize(),
+        }
@@ -0,0 +1,142 @@
+"""
+Query Embedding Cache
+Size-bounded LRU of query vectors keyed by embedding model and the question
+(lowercased, whitespace collapsed), wrapped around the embeddings object the vectorstore uses
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+# =======================
+# Configuration
+# =======================
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "4096"))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Rough per-entry footprint: list of Python floats plus the key string
+BYTES_PER_FLOAT = 8 + 24
+
+def embedding_text_key(text: str) -> str:
+    """
+    Text folded only in ways the uncased model ignores (case, whitespace)
+    Punctuation is kept: "What is C++?" and "What is C#?" embed differently
+    """
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+def entry_size(key: Tuple[str, str], vector: List[float]) -> int:
+    """Approximate bytes held by one cache entry"""
+    return len(vector) * BYTES_PER_FLOAT + len(key[0]) + len(key[1])
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that memoizes embed_query
+    Document embedding (ingestion) passes straight through
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+        max_bytes: int = EMBEDDING_CACHE_MAX_BYTES
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()  # called from the retrieval executor threads
+
+    def _key(self, text: str) -> Tuple[str, str]:
+        return self.model_name, embedding_text_key(text)
+
+    def _get(self, key: Tuple[str, str]):
+        with self._lock:
+            vector = self.entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def _put(self, key: Tuple[str, str], vector: List[float]):
+        with self._lock:
+            if key in self.entries:
+                return
+            self.entries[key] = vector
+            self.bytes += entry_size(key, vector)
+            while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+                old_key, old_vector = self.entries.popitem(last=False)
+                self.bytes -= entry_size(old_key, old_vector)
+                self.evictions += 1
+
+    def embed_query(self, text: str) -> List[float]:
+        """Cached query embedding"""
+        if not EMBEDDING_CACHE_ENABLED:
+            return self.underlying.embed_query(text)
+        key = self._key(text)
+        vector = self._get(key)
+        if vector is None:
+            vector = self.underlying.embed_query(text)
+            self._put(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Cached query embedding without blocking the event loop on a miss"""
+        if not EMBEDDING_CACHE_ENABLED:
+            return await self.underlying.aembed_query(text)
+        key = self._key(text)
+        vector = self._get(key)
+        if vector is None:
+            vector = await self.underlying.aembed_query(text)
+            self._put(key, vector)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Cached embeddings for many queries; misses are embedded in one batch"""
+        if not EMBEDDING_CACHE_ENABLED:
+            return self.underlying.embed_documents(texts)
+        keys = [self._key(text) for text in texts]
+        vectors = [self._get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            embedded = self.underlying.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+                self._put(keys[i], vector)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Corpus chunks are embedded once at ingestion, so they are not cached"""
+        return self.underlying.embed_documents(texts)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def snapshot(self) -> dict:
+        """Counters for the /health endpoint"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": EMBEDDING_CACHE_ENABLED,
+            "model": self.model_name,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
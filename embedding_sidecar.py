@@ -0,0 +1,217 @@
+"""
+Embedding Sidecar
+One process owns the embedding model and serves every uvicorn worker over a
+Unix domain socket, so model RAM is paid once and all embedding traffic is
+micro-batched in one place. Vectors travel as raw float32 buffers.
+
+Run:  python embedding_sidecar.py --socket /tmp/embeddings.sock
+Use:  EMBEDDING_BACKEND=sidecar EMBEDDING_SIDECAR_SOCKET=/tmp/embeddings.sock uvicorn app:app --workers 4
+
+Wire format (big-endian lengths):
+  request   op(1 byte) | count(u32) | count x [len(u32) | utf-8 text]
+  response  rows(i32, -1 on error) | dim(u32) | rows*dim little-endian float32
+            (error: len(u32) | utf-8 message)
+  op "E" embeds the texts, op "S" returns the sidecar stats as JSON (len(u32) | bytes)
+"""
+
+import os
+import json
+import socket
+import struct
+import asyncio
+import argparse
+import threading
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# =======================
+# Configuration
+# =======================
+EMBEDDING_SIDECAR_SOCKET = os.getenv("EMBEDDING_SIDECAR_SOCKET", "/tmp/embeddings.sock")
+EMBEDDING_SIDECAR_BACKEND = os.getenv("EMBEDDING_SIDECAR_BACKEND", "torch")  # model the sidecar runs
+EMBEDDING_SIDECAR_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_SIDECAR_TIMEOUT_SECONDS", "30"))
+
+OP_EMBED = b"E"
+OP_STATS = b"S"
+U32 = struct.Struct("!I")
+RESPONSE_HEADER = struct.Struct("!iI")
+FLOAT32 = np.dtype("<f4")
+
+# =======================
+# Framing Helpers
+# =======================
+def encode_request(op: bytes, texts: List[str]) -> bytes:
+    parts = [op, U32.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(U32.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+def recv_exact_into(sock: socket.socket, buffer) -> None:
+    """Fill a writable buffer from the socket (no intermediate copies)"""
+    view = memoryview(buffer)
+    while len(view):
+        received = sock.recv_into(view)
+        if not received:
+            raise ConnectionError("Embedding sidecar closed the connection")
+        view = view[received:]
+
+def recv_exact(sock: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    recv_exact_into(sock, buffer)
+    return buffer
+
+# =======================
+# Client
+# =======================
+class SidecarEmbeddings(Embeddings):
+    """Embeddings served by the sidecar; one connection per calling thread"""
+
+    def __init__(self, socket_path: str = EMBEDDING_SIDECAR_SOCKET, timeout: float = EMBEDDING_SIDECAR_TIMEOUT_SECONDS):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _reset(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    def _request(self, op: bytes, texts: List[str]):
+        payload = encode_request(op, texts)
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.sendall(payload)
+                return self._read_response(sock, op)
+            except (ConnectionError, OSError):
+                # Sidecar restarted or the connection went stale: reconnect once
+                self._reset()
+                if attempt:
+                    raise
+
+    def _read_response(self, sock: socket.socket, op: bytes):
+        if op == OP_STATS:
+            (size,) = U32.unpack(recv_exact(sock, U32.size))
+            return json.loads(recv_exact(sock, size))
+
+        rows, dim = RESPONSE_HEADER.unpack(recv_exact(sock, RESPONSE_HEADER.size))
+        if rows < 0:
+            (size,) = U32.unpack(recv_exact(sock, U32.size))
+            raise RuntimeError(f"Embedding sidecar error: {recv_exact(sock, size).decode('utf-8')}")
+        buffer = recv_exact(sock, rows * dim * FLOAT32.itemsize)
+        return np.frombuffer(buffer, dtype=FLOAT32).reshape(rows, dim)
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embeddings as a float32 matrix viewing the received buffer"""
+        if not texts:
+            return np.zeros((0, 0), dtype=FLOAT32)
+        return self._request(OP_EMBED, list(texts))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+    def stats(self) -> dict:
+        return self._request(OP_STATS, [])
+
+# =======================
+# Server
+# =======================
+class EmbeddingSidecar:
+    """Asyncio Unix-socket server in front of one micro-batched model"""
+
+    def __init__(self, model: Embeddings):
+        from embedding_batcher import EmbeddingBatcher
+
+        self.batcher = EmbeddingBatcher(model)
+        self.connections = 0
+        self.requests = 0
+        self.texts = 0
+        self.errors = 0
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        # Every text goes through the batcher so requests from all workers share forward passes
+        vectors = await asyncio.gather(*[self.batcher.aembed_query(text) for text in texts])
+        return np.asarray(vectors, dtype=FLOAT32)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    op = await reader.readexactly(1)
+                except asyncio.IncompleteReadError:
+                    break
+                (count,) = U32.unpack(await reader.readexactly(U32.size))
+                texts = []
+                for _ in range(count):
+                    (size,) = U32.unpack(await reader.readexactly(U32.size))
+                    texts.append((await reader.readexactly(size)).decode("utf-8"))
+
+                if op == OP_STATS:
+                    data = json.dumps(self.snapshot()).encode("utf-8")
+                    writer.write(U32.pack(len(data)) + data)
+                else:
+                    self.requests += 1
+                    self.texts += len(texts)
+                    try:
+                        matrix = await self.embed(texts)
+                        rows, dim = matrix.shape if matrix.ndim == 2 else (0, 0)
+                        writer.write(RESPONSE_HEADER.pack(rows, dim))
+                        writer.write(memoryview(np.ascontiguousarray(matrix)).cast("B"))
+                    except Exception as e:
+                        self.errors += 1
+                        message = str(e).encode("utf-8")
+                        writer.write(RESPONSE_HEADER.pack(-1, 0) + U32.pack(len(message)) + message)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def snapshot(self) -> dict:
+        return {
+            "connections": self.connections,
+            "requests": self.requests,
+            "texts": self.texts,
+            "errors": self.errors,
+            "batching": self.batcher.snapshot(),
+        }
+
+    async def serve(self, socket_path: str = EMBEDDING_SIDECAR_SOCKET):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(self.handle, path=socket_path)
+        os.chmod(socket_path, 0o660)
+        print(f"🧩 Embedding sidecar listening on {socket_path}")
+        async with server:
+            await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared embedding sidecar")
+    parser.add_argument("--socket", default=EMBEDDING_SIDECAR_SOCKET)
+    parser.add_argument("--backend", default=EMBEDDING_SIDECAR_BACKEND, choices=["torch", "onnx"])
+    args = parser.parse_args()
+
+    from embedding_backends import build_embeddings
+
+    model = build_embeddings(args.backend)
+    model.embed_query("warm up")
+    asyncio.run(EmbeddingSidecar(model).serve(args.socket))
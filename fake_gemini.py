@@ -0,0 +1,196 @@
+"""
+Fake Gemini Provider
+Local stand-in for the Gemini REST API (generateContent / streamGenerateContent)
+with configurable latency, per-key error injection and token streaming speed.
+
+Run as a server:   uvicorn fake_gemini:app --port 8100
+                   GEMINI_API_BASE_URL=http://127.0.0.1:8100/v1beta uvicorn app:app
+Or in-process:     GEMINI_FAKE_PROVIDER=inprocess uvicorn app:app
+(in-process responses are buffered by httpx, so use the server to measure streaming speed)
+"""
+
+import os
+import json
+import random
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# =======================
+# Configuration
+# =======================
+# Latency distribution: fixed | uniform | lognormal (median FAKE_GEMINI_LATENCY_MS, spread = sigma / half-width ratio)
+FAKE_GEMINI_LATENCY_DIST = os.getenv("FAKE_GEMINI_LATENCY_DIST", "lognormal")
+FAKE_GEMINI_LATENCY_MS = float(os.getenv("FAKE_GEMINI_LATENCY_MS", "800"))
+FAKE_GEMINI_LATENCY_SPREAD = float(os.getenv("FAKE_GEMINI_LATENCY_SPREAD", "0.5"))
+# Per-key errors: "<key prefix or *>:<status>:<rate>,..." e.g. "fake-key-1:429:0.5,*:500:0.01"
+FAKE_GEMINI_ERRORS = os.getenv("FAKE_GEMINI_ERRORS", "")
+# Per-key latency multipliers: "<key prefix or *>:<factor>,..." e.g. "fake-key-2:4"
+FAKE_GEMINI_SLOW_KEYS = os.getenv("FAKE_GEMINI_SLOW_KEYS", "")
+FAKE_GEMINI_TOKENS_PER_SECOND = float(os.getenv("FAKE_GEMINI_TOKENS_PER_SECOND", "80"))
+FAKE_GEMINI_ANSWER_TOKENS = int(os.getenv("FAKE_GEMINI_ANSWER_TOKENS", "60"))
+FAKE_GEMINI_SEED = os.getenv("FAKE_GEMINI_SEED")
+
+STATUS_NAMES = {
+    400: "INVALID_ARGUMENT",
+    401: "UNAUTHENTICATED",
+    403: "PERMISSION_DENIED",
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE",
+}
+
+FILLER_WORDS = (
+    "Kashaf Naveed is a MERN and AI developer who builds RAG systems, "
+    "full-stack web applications and intelligent automation with clean, scalable code."
+).split()
+
+# =======================
+# Helper Functions
+# =======================
+def parse_error_rules(spec: str) -> List[Tuple[str, int, float]]:
+    """Parse FAKE_GEMINI_ERRORS into (key prefix, status, rate) rules"""
+    rules = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, status, rate = item.rsplit(":", 2)
+        rules.append((prefix, int(status), float(rate)))
+    return rules
+
+def parse_slow_keys(spec: str) -> List[Tuple[str, float]]:
+    """Parse FAKE_GEMINI_SLOW_KEYS into (key prefix, factor) rules"""
+    rules = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, factor = item.rsplit(":", 1)
+        rules.append((prefix, float(factor)))
+    return rules
+
+def key_matches(prefix: str, api_key: str) -> bool:
+    """Whether a rule prefix ("*" for any key) applies to the key"""
+    return prefix == "*" or api_key.startswith(prefix)
+
+def extract_prompt(body: dict) -> str:
+    """Concatenate the text parts of a generateContent request"""
+    return " ".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+
+# =======================
+# Fake Provider
+# =======================
+class FakeGemini:
+    """Latency / failure model plus per-key counters"""
+
+    def __init__(self):
+        self.rng = random.Random(int(FAKE_GEMINI_SEED)) if FAKE_GEMINI_SEED else random.Random()
+        self.error_rules = parse_error_rules(FAKE_GEMINI_ERRORS)
+        self.slow_rules = parse_slow_keys(FAKE_GEMINI_SLOW_KEYS)
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def sample_latency(self, api_key: str) -> float:
+        """Seconds before the first byte for this key"""
+        median = FAKE_GEMINI_LATENCY_MS / 1000
+        if FAKE_GEMINI_LATENCY_DIST == "fixed":
+            latency = median
+        elif FAKE_GEMINI_LATENCY_DIST == "uniform":
+            latency = self.rng.uniform(median * (1 - FAKE_GEMINI_LATENCY_SPREAD), median * (1 + FAKE_GEMINI_LATENCY_SPREAD))
+        else:
+            latency = self.rng.lognormvariate(0, FAKE_GEMINI_LATENCY_SPREAD) * median
+
+        for prefix, factor in self.slow_rules:
+            if key_matches(prefix, api_key):
+                latency *= factor
+                break
+        return max(0.0, latency)
+
+    def pick_error(self, api_key: str) -> Optional[int]:
+        """HTTP status to fail with, or None"""
+        for prefix, status, rate in self.error_rules:
+            if key_matches(prefix, api_key) and self.rng.random() < rate:
+                return status
+        return None
+
+    def answer_words(self, max_output_tokens: int) -> List[str]:
+        """Canned answer, one word per token, capped by maxOutputTokens"""
+        count = max(1, min(FAKE_GEMINI_ANSWER_TOKENS, max_output_tokens))
+        return [FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(count)]
+
+FAKE = FakeGemini()
+
+def error_response(status: int) -> JSONResponse:
+    """Gemini-shaped error body"""
+    return JSONResponse(
+        {"error": {"code": status, "message": f"Injected {STATUS_NAMES.get(status, 'ERROR')}", "status": STATUS_NAMES.get(status, "UNKNOWN")}},
+        status_code=status
+    )
+
+def candidate_payload(text: str, prompt: str, output_tokens: int, finished: bool) -> dict:
+    """Gemini-shaped response chunk"""
+    payload = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+    if finished:
+        payload["candidates"][0]["finishReason"] = "STOP"
+        payload["usageMetadata"] = {
+            "promptTokenCount": len(prompt) // 4,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": len(prompt) // 4 + output_tokens,
+        }
+    return payload
+
+# =======================
+# FastAPI App
+# =======================
+app = FastAPI(title="Fake Gemini", description="Offline stand-in for load testing the LLM call path")
+
+@app.post("/v1beta/models/{model_action}")
+async def generate(model_action: str, request: Request):
+    """generateContent and streamGenerateContent (alt=sse)"""
+    model, _, action = model_action.partition(":")
+    api_key = request.headers.get("x-goog-api-key") or request.query_params.get("key", "")
+    body = await request.json()
+    prompt = extract_prompt(body)
+    max_output_tokens = int(body.get("generationConfig", {}).get("maxOutputTokens", 2048))
+
+    stats = FAKE.stats[api_key[:10] or "anonymous"]
+    stats["requests"] += 1
+
+    if not api_key:
+        stats["errors_401"] += 1
+        return error_response(401)
+
+    await asyncio.sleep(FAKE.sample_latency(api_key))
+
+    status = FAKE.pick_error(api_key)
+    if status:
+        stats[f"errors_{status}"] += 1
+        return error_response(status)
+
+    words = FAKE.answer_words(max_output_tokens)
+
+    if action == "generateContent":
+        # Whole answer "generated" before responding
+        await asyncio.sleep(len(words) / FAKE_GEMINI_TOKENS_PER_SECOND)
+        stats["ok"] += 1
+        return candidate_payload(" ".join(words), prompt, len(words), finished=True)
+
+    if action == "streamGenerateContent":
+        async def events():
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(1 / FAKE_GEMINI_TOKENS_PER_SECOND)
+                text = word if i == 0 else " " + word
+                payload = candidate_payload(text, prompt, len(words), finished=(i == len(words) - 1))
+                yield f"data: {json.dumps(payload)}\r\n\r\n"
+            stats["ok"] += 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return error_response(400)
+
+@app.get("/stats")
+async def fake_stats():
+    """Per-key request / error counters"""
+    return {key: dict(counts) for key, counts in FAKE.stats.items()}
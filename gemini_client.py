@@ -0,0 +1,173 @@
+"""
+Async Gemini Client
+Calls the Gemini REST API natively on the event loop over a shared httpx connection pool
+"""
+
+import os
+import json
+from typing import AsyncIterator, List, Optional
+
+import httpx
+
+# =======================
+# Configuration
+# =======================
+GEMINI_API_BASE_URL = os.getenv("GEMINI_API_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "200"))
+# "inprocess" routes every call to the fake provider in fake_gemini.py (no network, no quota)
+GEMINI_FAKE_PROVIDER = os.getenv("GEMINI_FAKE_PROVIDER", "").lower()
+# 2.5 models count thinking tokens against maxOutputTokens; 0 disables thinking
+GEMINI_THINKING_BUDGET = int(os.getenv("GEMINI_THINKING_BUDGET", "0"))
+
+DEFAULT_GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "maxOutputTokens": 2048,
+    "thinkingConfig": {"thinkingBudget": GEMINI_THINKING_BUDGET},
+}
+
+# =======================
+# Errors
+# =======================
+class GeminiAPIError(Exception):
+    """Raised when the Gemini API returns an error or an empty response"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+# =======================
+# Shared HTTP Client
+# =======================
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared async HTTP client (created on first use)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        transport = None
+        if GEMINI_FAKE_PROVIDER == "inprocess":
+            from fake_gemini import app as fake_app
+            print("🧪 Gemini calls routed to the in-process fake provider")
+            transport = httpx.ASGITransport(app=fake_app)
+
+        _http_client = httpx.AsyncClient(
+            base_url=GEMINI_API_BASE_URL,
+            transport=transport,
+            timeout=httpx.Timeout(GEMINI_TIMEOUT_SECONDS, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=GEMINI_MAX_CONNECTIONS,
+                max_keepalive_connections=GEMINI_MAX_CONNECTIONS,
+            ),
+        )
+    return _http_client
+
+async def close_http_client():
+    """Close the shared HTTP client (called on shutdown)"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+# =======================
+# Helper Functions
+# =======================
+def build_request_body(prompt: str, generation_config: Optional[dict] = None) -> dict:
+    """Build a generateContent request body for a single-turn prompt"""
+    return {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": generation_config or DEFAULT_GENERATION_CONFIG,
+    }
+
+def extract_text(data: dict) -> str:
+    """Extract the answer text from a generateContent response"""
+    candidates = data.get("candidates") or []
+    if not candidates:
+        feedback = data.get("promptFeedback", {})
+        raise GeminiAPIError(f"No candidates returned: {feedback}")
+
+    parts = candidates[0].get("content", {}).get("parts") or []
+    return "".join(part.get("text", "") for part in parts)
+
+def raise_for_error(response: httpx.Response):
+    """Raise GeminiAPIError for non-2xx responses"""
+    if response.is_success:
+        return
+    try:
+        message = response.json().get("error", {}).get("message", response.text)
+    except ValueError:
+        message = response.text
+    raise GeminiAPIError(f"HTTP {response.status_code}: {message}", status_code=response.status_code)
+
+# =======================
+# Key-Scoped Clients
+# =======================
+class GeminiKeyClient:
+    """Gemini client bound to a single API key and model"""
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = GEMINI_MODEL,
+        generation_config: Optional[dict] = None
+    ):
+        self.api_key = api_key
+        self.key_id = api_key[:10]
+        self.model_name = model_name
+        self.generation_config = generation_config or DEFAULT_GENERATION_CONFIG
+        self._headers = {"x-goog-api-key": api_key}
+        self._generate_url = f"/models/{model_name}:generateContent"
+        self._stream_url = f"/models/{model_name}:streamGenerateContent"
+
+    async def generate_content(
+        self,
+        prompt: str,
+        generation_config: Optional[dict] = None,
+        model_name: Optional[str] = None
+    ) -> str:
+        """Generate a response for the prompt with this client's key (optionally on another model)"""
+        client = get_http_client()
+        response = await client.post(
+            f"/models/{model_name}:generateContent" if model_name else self._generate_url,
+            headers=self._headers,
+            json=build_request_body(prompt, generation_config or self.generation_config),
+        )
+        raise_for_error(response)
+        return extract_text(response.json()).strip()
+
+    async def stream_content(
+        self,
+        prompt: str,
+        generation_config: Optional[dict] = None,
+        model_name: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream response text chunks for the prompt as Gemini produces them"""
+        client = get_http_client()
+        async with client.stream(
+            "POST",
+            f"/models/{model_name}:streamGenerateContent" if model_name else self._stream_url,
+            params={"alt": "sse"},
+            headers=self._headers,
+            json=build_request_body(prompt, generation_config or self.generation_config),
+        ) as response:
+            if not response.is_success:
+                await response.aread()
+                raise_for_error(response)
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if not payload:
+                    continue
+                data = json.loads(payload)
+                if not data.get("candidates") and not data.get("promptFeedback"):
+                    continue  # usage-only chunk
+                text = extract_text(data)
+                if text:
+                    yield text
+
+def build_key_clients(api_keys: List[str], model_name: str = GEMINI_MODEL) -> List[GeminiKeyClient]:
+    """Build one client per API key (called once at startup)"""
+    return [GeminiKeyClient(api_key, model_name=model_name) for api_key in api_keys]
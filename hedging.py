@@ -0,0 +1,92 @@
+"""
+Hedged Requests
+Fires a backup LLM call on another key when the first one is slower than recent
+tail latency, takes whichever finishes first and cancels the loser
+"""
+
+import os
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+# =======================
+# Configuration
+# =======================
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "0.5"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+# =======================
+# Counters
+# =======================
+class HedgeStats:
+    """Hedge rate and win-rate counters"""
+
+    def __init__(self):
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+
+    def snapshot(self) -> dict:
+        """Counters for the /health endpoint"""
+        return {
+            "enabled": HEDGE_REQUESTS,
+            "percentile": HEDGE_PERCENTILE,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.requests, 3) if self.requests else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "primary_wins": self.primary_wins,
+            "hedge_win_rate": round(self.hedge_wins / self.hedged, 3) if self.hedged else 0.0,
+        }
+
+# =======================
+# Hedged Call
+# =======================
+async def hedged_call(
+    start_primary: Callable[[], Awaitable],
+    start_hedge: Callable[[], Optional[Awaitable]],
+    delay: float,
+    stats: HedgeStats
+):
+    """
+    Run the primary call; if it has not finished after `delay` seconds start the hedge
+    (start_hedge may return None when no backup is available) and return the first success.
+    Raises the last error if every started call fails.
+    """
+    stats.requests += 1
+    primary = asyncio.ensure_future(start_primary())
+    hedge = None
+
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        hedge_call = start_hedge()
+        if hedge_call is None:
+            return await primary
+
+        stats.hedged += 1
+        hedge = asyncio.ensure_future(hedge_call)
+        pending = {primary, hedge}
+        last_error = None
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        stats.hedge_wins += 1
+                    else:
+                        stats.primary_wins += 1
+                    return task.result()
+                last_error = task.exception()
+
+        raise last_error
+
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
@@ -34,51 +34,8 @@ import json
 BASE_URL = "http://127.0.0.0:8000"
 headers = {"X-API-Key": "super-secret-token"}
 
-# Define metadata for each file
-FILE_METADATA = {
-    "ai-expertise.md": {
-        "category": "expertise",
-        "topic": "artificial-intelligence",
-        "tags": ["AI", "machine-learning", "expertise"],
-        "importance": "high"
-    },
-    "education.md": {
-        "category": "background",
-        "topic": "education",
-        "tags": ["education", "academic", "qualifications"],
-        "importance": "high"
-    },
-    "experience.md": {
-        "category": "background",
-        "topic": "work-experience",
-        "tags": ["experience", "career", "professional"],
-        "importance": "high"
-    },
-    "identity.md": {
-        "category": "personal",
-        "topic": "identity",
-        "tags": ["identity", "personal", "introduction"],
-        "importance": "high"
-    },
-    "projects.md": {
-        "category": "portfolio",
-        "topic": "projects",
-        "tags": ["projects", "portfolio", "work"],
-        "importance": "high"
-    },
-    "skills.md": {
-        "category": "expertise",
-        "topic": "skills",
-        "tags": ["skills", "technical", "capabilities"],
-        "importance": "high"
-    },
-    "work-philosophy.md": {
-        "category": "personal",
-        "topic": "philosophy",
-        "tags": ["philosophy", "values", "approach"],
-        "importance": "medium"
-    }
-}
+# Per-file metadata lives next to the chunker so ingestion and retrieval share it
+from corpus_metadata import file_metadata
 
 
 def load_documents_with_metadata(data_dir: str = "data") -> List[Dict[str, Any]]:
@@ -111,13 +68,8 @@ def load_documents_with_metadata(data_dir: str = "data") -> List[Dict[str, Any]]
             
             file_name = file_path.name
             
-            # Get predefined metadata or create default
-            metadata = FILE_METADATA.get(file_name, {
-                "category": "general",
-                "topic": file_name.replace(".md", ""),
-                "tags": [file_name.replace(".md", "")],
-                "importance": "medium"
-            })
+            # Get predefined metadata or create default (a copy, so the table is never mutated)
+            metadata = file_metadata(file_name)
             
             # Add file-specific metadata
             metadata.update({
@@ -0,0 +1,93 @@
+"""
+Intent Router
+Keyword-based query intent detection that narrows retrieval to the relevant
+knowledge-base topics (e.g. education questions search only education.md),
+shrinking the search space and the prompt. Ambiguous questions search everything.
+"""
+
+import os
+import re
+from collections import Counter
+from typing import List, Optional
+
+from rag_utils import normalize_question
+
+# =======================
+# Configuration
+# =======================
+INTENT_ROUTING_ENABLED = os.getenv("INTENT_ROUTING_ENABLED", "true").lower() == "true"
+INTENT_MAX_TOPICS = int(os.getenv("INTENT_MAX_TOPICS", "2"))  # more matches than this means "search everything"
+INTENT_FILTER_FIELD = "topic"
+
+# Topic (corpus_metadata.FILE_METADATA) -> trigger words / phrases, matched on whole words
+TOPIC_KEYWORDS = {
+    "education": (
+        "education", "degree", "university", "college", "school", "study", "studies", "studying",
+        "cgpa", "gpa", "bscs", "semester", "graduate", "graduation", "academic", "qualification",
+    ),
+    "work-experience": (
+        "experience", "job", "jobs", "company", "companies", "employer", "intern", "internship",
+        "worked", "working", "career", "role", "position",
+    ),
+    "projects": (
+        "project", "projects", "portfolio", "built", "build", "chatbot", "try on", "spectacles",
+        "crm", "hubspot", "multilingual", "marketing platform", "gaming",
+    ),
+    "skills": (
+        "skill", "skills", "programming language", "programming languages", "framework", "frameworks",
+        "tech stack", "stack", "tools", "proficient", "react", "fastapi", "node", "mern",
+    ),
+    "artificial-intelligence": (
+        "ai", "artificial intelligence", "machine learning", "ml", "deep learning", "llm", "llms",
+        "nlp", "rag", "neural", "cnn", "cnns", "vae", "vaes", "generative",
+    ),
+    "identity": (
+        "who is", "who are you", "introduce", "name", "contact", "email", "linkedin", "github",
+        "location", "based", "resume", "cv",
+    ),
+    "philosophy": (
+        "philosophy", "values", "value", "approach", "believe", "belief", "principles",
+        "motivation", "motivates", "goals", "goal", "mindset",
+    ),
+}
+TOPIC_PATTERNS = {
+    topic: re.compile(r"\b(" + "|".join(re.escape(k) for k in keywords) + r")\b")
+    for topic, keywords in TOPIC_KEYWORDS.items()
+}
+
+# =======================
+# Router
+# =======================
+class IntentRouter:
+    """Maps a question to the topics worth searching"""
+
+    def __init__(self):
+        self.topics = Counter()
+        self.unfiltered = 0
+        self.fallbacks = 0
+
+    def classify(self, q: str) -> Optional[List[str]]:
+        """Topics to restrict retrieval to, or None to search the whole corpus"""
+        if not INTENT_ROUTING_ENABLED:
+            return None
+        normalized = normalize_question(q)
+        topics = [topic for topic, pattern in TOPIC_PATTERNS.items() if pattern.search(normalized)]
+        if not topics or len(topics) > INTENT_MAX_TOPICS:
+            self.unfiltered += 1
+            return None
+        self.topics.update(topics)
+        return topics
+
+    def search_filter(self, topics: Optional[List[str]]) -> Optional[dict]:
+        """Metadata filter for the in-process stores ({"topic": [...]})"""
+        return {INTENT_FILTER_FIELD: topics} if topics else None
+
+    def snapshot(self) -> dict:
+        """Counters for the /health endpoint"""
+        return {
+            "enabled": INTENT_ROUTING_ENABLED,
+            "max_topics": INTENT_MAX_TOPICS,
+            "filtered_by_topic": dict(self.topics),
+            "unfiltered": self.unfiltered,
+            "empty_filter_fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,212 @@
+"""
+Health-Aware API Key Scheduler
+Tracks per-key errors and latency, opens circuit breakers on failing keys
+and orders keys so the healthiest / fastest one is tried first
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Dict, List, Optional
+
+import httpx
+
+# =======================
+# Configuration
+# =======================
+KEY_BASE_COOLDOWN_SECONDS = float(os.getenv("KEY_BASE_COOLDOWN_SECONDS", "5"))
+KEY_MAX_COOLDOWN_SECONDS = float(os.getenv("KEY_MAX_COOLDOWN_SECONDS", "300"))
+KEY_FAILURE_THRESHOLD = int(os.getenv("KEY_FAILURE_THRESHOLD", "2"))
+KEY_LATENCY_ALPHA = float(os.getenv("KEY_LATENCY_ALPHA", "0.3"))
+KEY_LATENCY_WINDOW = int(os.getenv("KEY_LATENCY_WINDOW", "200"))
+
+# Error classes that open the circuit on the first failure
+IMMEDIATE_OPEN_ERRORS = {"rate_limited", "forbidden"}
+
+# =======================
+# Helper Functions
+# =======================
+def classify_error(error: Exception) -> str:
+    """Classify an LLM call error (rate_limited, forbidden, timeout, server_error, other)"""
+    if isinstance(error, (httpx.TimeoutException, asyncio.TimeoutError)):
+        return "timeout"
+
+    status_code = getattr(error, "status_code", None)
+    if status_code == 429:
+        return "rate_limited"
+    if status_code in (401, 403):
+        return "forbidden"
+    if status_code is not None and status_code >= 500:
+        return "server_error"
+    return "other"
+
+def empty_error_counts() -> Dict[str, int]:
+    """Zeroed counters for every error class"""
+    return {"rate_limited": 0, "forbidden": 0, "timeout": 0, "server_error": 0, "other": 0}
+
+# =======================
+# Per-Key Health
+# =======================
+class KeyHealth:
+    """Health state and circuit breaker for a single API key"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.consecutive_failures = 0
+        self.cooldown = 0.0
+        self.open_until = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.in_flight = 0
+        self.successes = 0
+        self.errors = empty_error_counts()
+        self.last_error: Optional[str] = None
+
+    def is_open(self, now: float) -> bool:
+        """Whether the circuit is open (key cooling down)"""
+        return now < self.open_until
+
+    def score(self) -> float:
+        """Lower is better: recent latency weighted by concurrent load"""
+        latency = self.latency_ewma or 0.0
+        return latency * (1 + self.in_flight)
+
+# =======================
+# Scheduler
+# =======================
+class KeyScheduler:
+    """Orders key clients by health and records call outcomes"""
+
+    def __init__(
+        self,
+        key_clients: list,
+        base_cooldown: float = KEY_BASE_COOLDOWN_SECONDS,
+        max_cooldown: float = KEY_MAX_COOLDOWN_SECONDS,
+        failure_threshold: int = KEY_FAILURE_THRESHOLD,
+        latency_alpha: float = KEY_LATENCY_ALPHA,
+        latency_window: int = KEY_LATENCY_WINDOW
+    ):
+        self.key_clients = list(key_clients)
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.failure_threshold = failure_threshold
+        self.latency_alpha = latency_alpha
+        self.health = {id(kc): KeyHealth(f"key_{i + 1}") for i, kc in enumerate(self.key_clients)}
+        self.recent_latencies = deque(maxlen=latency_window)
+        self._rotation = 0
+
+    def __len__(self) -> int:
+        return len(self.key_clients)
+
+    def get_health(self, key_client) -> KeyHealth:
+        """Health state for a key client"""
+        return self.health[id(key_client)]
+
+    def is_available(self, key_client) -> bool:
+        """Whether the key's circuit is closed"""
+        return not self.get_health(key_client).is_open(time.monotonic())
+
+    def latency_percentile(self, percentile: float, min_samples: int = 1) -> Optional[float]:
+        """Recent full-call latency percentile across keys (None until enough samples)"""
+        if len(self.recent_latencies) < max(1, min_samples):
+            return None
+        ordered = sorted(self.recent_latencies)
+        index = min(len(ordered) - 1, int(percentile * len(ordered)))
+        return ordered[index]
+
+    def ordered_clients(self) -> list:
+        """
+        Key clients in the order they should be tried
+        Closed circuits first (fastest / least loaded, round-robin on ties),
+        then open circuits by how soon they cool down
+        """
+        if not self.key_clients:
+            return []
+
+        now = time.monotonic()
+        count = len(self.key_clients)
+        start = self._rotation
+        self._rotation = (self._rotation + 1) % count
+
+        indexed = list(enumerate(self.key_clients))
+        closed = [(i, kc) for i, kc in indexed if not self.get_health(kc).is_open(now)]
+        opened = [(i, kc) for i, kc in indexed if self.get_health(kc).is_open(now)]
+
+        closed.sort(key=lambda item: (
+            self.get_health(item[1]).consecutive_failures,
+            self.get_health(item[1]).score(),
+            (item[0] - start) % count,
+        ))
+        opened.sort(key=lambda item: self.get_health(item[1]).open_until)
+        return [kc for _, kc in closed + opened]
+
+    def record_start(self, key_client) -> float:
+        """Mark a call as in flight; returns the start time"""
+        self.get_health(key_client).in_flight += 1
+        return time.perf_counter()
+
+    def record_success(self, key_client, started: float, sample_latency: bool = True):
+        """
+        Record a successful call and close the key's circuit
+        sample_latency=False keeps partial timings (e.g. time to first token) out of the tail window
+        """
+        health = self.get_health(key_client)
+        latency = time.perf_counter() - started
+        if sample_latency:
+            self.recent_latencies.append(latency)
+        health.in_flight = max(0, health.in_flight - 1)
+        health.successes += 1
+        health.consecutive_failures = 0
+        health.cooldown = 0.0
+        health.open_until = 0.0
+        if health.latency_ewma is None:
+            health.latency_ewma = latency
+        else:
+            health.latency_ewma += self.latency_alpha * (latency - health.latency_ewma)
+
+    def record_failure(self, key_client, error: Exception) -> str:
+        """Record a failed call, opening the circuit with exponential cooldown when needed"""
+        health = self.get_health(key_client)
+        error_class = classify_error(error)
+        health.in_flight = max(0, health.in_flight - 1)
+        health.consecutive_failures += 1
+        health.errors[error_class] += 1
+        health.last_error = f"{error_class}: {str(error)[:100]}"
+
+        if error_class == "forbidden":
+            # Revoked / invalid keys will not recover quickly
+            health.cooldown = self.max_cooldown
+        elif error_class in IMMEDIATE_OPEN_ERRORS or health.consecutive_failures >= self.failure_threshold:
+            health.cooldown = min(
+                self.max_cooldown,
+                health.cooldown * 2 if health.cooldown else self.base_cooldown
+            )
+        else:
+            return error_class
+
+        health.open_until = time.monotonic() + health.cooldown
+        print(f"🚧 {health.name} circuit open for {health.cooldown:.0f}s ({error_class})")
+        return error_class
+
+    def record_cancelled(self, key_client):
+        """Release an in-flight slot for a call that was cancelled"""
+        health = self.get_health(key_client)
+        health.in_flight = max(0, health.in_flight - 1)
+
+    def snapshot(self) -> List[dict]:
+        """Per-key health for the /health endpoint"""
+        now = time.monotonic()
+        return [
+            {
+                "key": health.name,
+                "state": "open" if health.is_open(now) else "closed",
+                "cooldown_remaining_s": round(max(0.0, health.open_until - now), 1),
+                "consecutive_failures": health.consecutive_failures,
+                "latency_ewma_ms": round(health.latency_ewma * 1000, 1) if health.latency_ewma is not None else None,
+                "in_flight": health.in_flight,
+                "successes": health.successes,
+                "errors": dict(health.errors),
+                "last_error": health.last_error,
+            }
+            for health in (self.get_health(kc) for kc in self.key_clients)
+        ]
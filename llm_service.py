@@ -0,0 +1,195 @@
+"""
+LLM Service
+Gemini key rotation: health-ordered key scheduling, RPM/TPM pacing,
+optional hedging and streaming failover on top of the key-scoped clients
+"""
+
+import os
+import asyncio
+from typing import Optional
+
+from gemini_client import build_key_clients, DEFAULT_GENERATION_CONFIG
+from key_scheduler import KeyScheduler
+from rate_limiter import KeyPacer, estimate_tokens
+from hedging import (
+    HEDGE_REQUESTS, HEDGE_PERCENTILE, HEDGE_MIN_DELAY_SECONDS, HEDGE_MIN_SAMPLES,
+    HedgeStats, hedged_call
+)
+
+# =======================
+# Environment Variables
+# =======================
+GEMINI_API_KEYS = os.getenv("GEMINI_API_KEYS", "")
+GEMINI_API_KEY_LIST = [k.strip() for k in GEMINI_API_KEYS.split(",") if k.strip()]
+
+# =======================
+# 🔥 API KEY ROTATION LOGIC
+# =======================
+GEMINI_KEY_CLIENTS = build_key_clients(GEMINI_API_KEY_LIST)
+KEY_SCHEDULER = KeyScheduler(GEMINI_KEY_CLIENTS)
+KEY_PACER = KeyPacer(GEMINI_KEY_CLIENTS)
+HEDGE_STATS = HedgeStats()
+
+def estimate_call_tokens(prompt: str, generation_config: Optional[dict] = None) -> int:
+    """Estimate the TPM cost of a generation call"""
+    max_output_tokens = (generation_config or DEFAULT_GENERATION_CONFIG).get("maxOutputTokens", 0)
+    return estimate_tokens(prompt, max_output_tokens)
+
+async def acquire_key_client(remaining: list, tokens: int):
+    """
+    Take the healthiest remaining key with RPM/TPM capacity (queues briefly if all are busy)
+    Open-circuit keys are only used once no closed-circuit key is left
+    """
+    key_client = await KEY_PACER.acquire(remaining, tokens, KEY_SCHEDULER.is_available)
+    if key_client is None:
+        raise Exception("All API keys are at their rate limit. Please try again shortly.")
+    remaining.remove(key_client)
+    return key_client
+
+def record_key_failure(key_client, error: Exception) -> str:
+    """Record a failed call with the scheduler and pacer"""
+    error_class = KEY_SCHEDULER.record_failure(key_client, error)
+    if error_class == "rate_limited":
+        KEY_PACER.mark_exhausted(key_client)
+    return error_class
+
+async def call_key_client(
+    key_client,
+    prompt: str,
+    generation_config: Optional[dict] = None,
+    model_name: Optional[str] = None
+) -> str:
+    """Single generation attempt on one key, recorded with the scheduler"""
+    health = KEY_SCHEDULER.get_health(key_client)
+    started = KEY_SCHEDULER.record_start(key_client)
+    try:
+        answer = await key_client.generate_content(prompt, generation_config, model_name)
+        KEY_SCHEDULER.record_success(key_client, started)
+        print(f"✅ Success with {health.name}")
+        return answer
+    except asyncio.CancelledError:
+        KEY_SCHEDULER.record_cancelled(key_client)
+        raise
+    except Exception as e:
+        error_class = record_key_failure(key_client, e)
+        print(f"❌ {health.name} failed ({error_class}): {str(e)[:100]}")
+        raise
+
+async def hedged_key_call(
+    key_client,
+    remaining: list,
+    tokens: int,
+    prompt: str,
+    generation_config: Optional[dict] = None,
+    model_name: Optional[str] = None
+) -> str:
+    """Call the key, hedging onto another healthy key if it is slower than recent tail latency"""
+    delay = KEY_SCHEDULER.latency_percentile(HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES)
+    if delay is None:
+        return await call_key_client(key_client, prompt, generation_config, model_name)
+
+    def start_hedge():
+        # Hedges never queue: only use a key that has capacity right now
+        for backup in list(remaining):
+            if KEY_SCHEDULER.is_available(backup) and KEY_PACER.try_acquire(backup, tokens):
+                remaining.remove(backup)
+                print(f"🪝 Hedging onto {KEY_SCHEDULER.get_health(backup).name}")
+                return call_key_client(backup, prompt, generation_config, model_name)
+        return None
+
+    return await hedged_call(
+        lambda: call_key_client(key_client, prompt, generation_config, model_name),
+        start_hedge,
+        max(delay, HEDGE_MIN_DELAY_SECONDS),
+        HEDGE_STATS
+    )
+
+async def try_all_keys_for_genai_call(
+    prompt: str,
+    max_attempts: int = None,
+    generation_config: Optional[dict] = None,
+    model_name: Optional[str] = None
+):
+    """Try calling Gemini API with keys in health order until one succeeds"""
+    if max_attempts is None:
+        max_attempts = len(GEMINI_API_KEY_LIST)
+    
+    remaining = KEY_SCHEDULER.ordered_clients()[:max_attempts]
+    if not remaining:
+        raise Exception("No API keys available")
+    
+    total = len(remaining)
+    tokens = estimate_call_tokens(prompt, generation_config)
+    last_error = None
+    attempt = 0
+    
+    while remaining:
+        key_client = await acquire_key_client(remaining, tokens)
+        attempt += 1
+        try:
+            print(f"🔑 Attempt {attempt}/{total} with {KEY_SCHEDULER.get_health(key_client).name}: {key_client.key_id}...")
+            
+            if HEDGE_REQUESTS and attempt == 1:
+                return await hedged_key_call(key_client, remaining, tokens, prompt, generation_config, model_name)
+            return await call_key_client(key_client, prompt, generation_config, model_name)
+            
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            last_error = e
+            continue
+    
+    raise Exception(f"All {total} API keys failed. Last error: {str(last_error)}")
+
+async def try_all_keys_for_genai_stream(
+    prompt: str,
+    max_attempts: int = None,
+    generation_config: Optional[dict] = None,
+    model_name: Optional[str] = None
+):
+    """Stream Gemini response chunks, failing over to the next healthy key until the first chunk arrives"""
+    if max_attempts is None:
+        max_attempts = len(GEMINI_API_KEY_LIST)
+    
+    remaining = KEY_SCHEDULER.ordered_clients()[:max_attempts]
+    if not remaining:
+        raise Exception("No API keys available")
+    
+    total = len(remaining)
+    tokens = estimate_call_tokens(prompt, generation_config)
+    last_error = None
+    
+    for attempt in range(total):
+        key_client = await acquire_key_client(remaining, tokens)
+        health = KEY_SCHEDULER.get_health(key_client)
+        started = KEY_SCHEDULER.record_start(key_client)
+        first_chunk = True
+        try:
+            print(f"🔑 Stream attempt {attempt + 1}/{total} with {health.name}: {key_client.key_id}...")
+            
+            async for chunk in key_client.stream_content(prompt, generation_config, model_name):
+                if first_chunk:
+                    # Time to first token is the latency signal for streams
+                    KEY_SCHEDULER.record_success(key_client, started, sample_latency=False)
+                    first_chunk = False
+                yield chunk
+            
+            if first_chunk:
+                KEY_SCHEDULER.record_success(key_client, started, sample_latency=False)
+            print(f"✅ Stream finished with {health.name}")
+            return
+            
+        except (asyncio.CancelledError, GeneratorExit):
+            if first_chunk:
+                KEY_SCHEDULER.record_cancelled(key_client)
+            raise
+        except Exception as e:
+            # Once tokens reached the client we cannot switch keys mid-answer
+            if not first_chunk:
+                raise
+            last_error = e
+            error_class = record_key_failure(key_client, e)
+            print(f"❌ {health.name} failed ({error_class}): {str(e)[:100]}")
+            continue
+    
+    raise Exception(f"All {total} API keys failed. Last error: {str(last_error)}")
@@ -0,0 +1,217 @@
+"""
+In-Process NumPy Vector Index
+Contiguous float32 matrix of normalized chunk embeddings searched with one
+matrix-vector product. Saved as a .npy file (memory-mapped at startup) plus a
+JSON sidecar with the chunk text and metadata.
+"""
+
+import os
+import json
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from context_builder import chunk_key
+
+# =======================
+# Configuration
+# =======================
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "auto")  # "auto", "qdrant" or "numpy"
+NUMPY_INDEX_PATH = Path(os.getenv("NUMPY_INDEX_PATH", "local_index"))
+NUMPY_INDEX_MAX_CHUNKS = int(os.getenv("NUMPY_INDEX_MAX_CHUNKS", "20000"))
+
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.json"
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row (zero rows stay zero)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+def write_temp_file(directory: Path, name: str, write) -> str:
+    """Write a file's new contents to a temp file in the same directory (same filesystem for os.replace)"""
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path
+
+def matches_filter(metadata: dict, filter: Optional[dict]) -> bool:
+    """Exact-match metadata filter: {"key": value} or {"key": [allowed values]}"""
+    if not filter:
+        return True
+    for key, expected in filter.items():
+        value = metadata.get(key)
+        if isinstance(expected, (list, tuple, set)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+def use_numpy_index(chunk_count: int) -> bool:
+    """Whether a corpus of this size should be served from the in-process index"""
+    if VECTOR_BACKEND == "numpy":
+        return True
+    if VECTOR_BACKEND == "qdrant":
+        return False
+    return chunk_count <= NUMPY_INDEX_MAX_CHUNKS
+
+class NumpyVectorStore(VectorStore):
+    """VectorStore over an in-memory (or memory-mapped) normalized embedding matrix; scores are cosine similarity"""
+
+    def __init__(self, embedding: Embeddings, vectors: Optional[np.ndarray] = None, documents: Optional[List[Document]] = None):
+        self.embedding = embedding
+        self.vectors = vectors if vectors is not None else np.zeros((0, 0), dtype=np.float32)
+        self.documents: List[Document] = documents or []
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    # =======================
+    # Writing
+    # =======================
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        new_vectors = normalize_rows(np.asarray(self.embedding.embed_documents(texts), dtype=np.float32))
+
+        with self._lock:
+            start = len(self.documents)
+            # vstack copies, so a memory-mapped matrix becomes a regular in-memory one
+            self.vectors = new_vectors if start == 0 else np.ascontiguousarray(np.vstack([self.vectors, new_vectors]))
+            self.documents.extend(
+                Document(page_content=text, metadata=dict(metadata)) for text, metadata in zip(texts, metadatas)
+            )
+        return [str(i) for i in range(start, start + len(texts))]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any
+    ) -> "NumpyVectorStore":
+        store = cls(embedding)
+        store.add_texts(texts, metadatas)
+        return store
+
+    def save(self, path: Path = NUMPY_INDEX_PATH):
+        """
+        Write the matrix (.npy) and chunk payloads (JSON) to a directory
+        Files are written beside the old ones and renamed into place (vectors last), so stores
+        that memory-mapped the previous matrix, here or in other workers, keep the old inode
+        instead of seeing it truncated underneath them
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        payload = [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in self.documents]
+        documents_tmp = write_temp_file(
+            path, DOCUMENTS_FILE,
+            lambda f: f.write(json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"))
+        )
+        vectors_tmp = write_temp_file(path, VECTORS_FILE, lambda f: np.save(f, self.vectors))
+        os.replace(documents_tmp, path / DOCUMENTS_FILE)
+        os.replace(vectors_tmp, path / VECTORS_FILE)
+        print(f"💾 Saved NumPy index ({len(self.documents)} chunks) to {path}")
+
+    @classmethod
+    def load(cls, embedding: Embeddings, path: Path = NUMPY_INDEX_PATH) -> "NumpyVectorStore":
+        """Open a saved index; the matrix is memory-mapped rather than read into memory"""
+        path = Path(path)
+        vectors = np.load(path / VECTORS_FILE, mmap_mode="r")
+        with open(path / DOCUMENTS_FILE, encoding="utf-8") as f:
+            payload = json.load(f)
+        documents = [Document(page_content=item["page_content"], metadata=item["metadata"]) for item in payload]
+        if len(documents) != vectors.shape[0]:
+            raise ValueError(f"NumPy index is inconsistent: {vectors.shape[0]} vectors, {len(documents)} documents")
+        return cls(embedding, vectors, documents)
+
+    @staticmethod
+    def saved_size(path: Path = NUMPY_INDEX_PATH) -> Optional[int]:
+        """Chunk count of a saved index without loading it, or None if there is none"""
+        path = Path(path)
+        if not (path / VECTORS_FILE).exists() or not (path / DOCUMENTS_FILE).exists():
+            return None
+        return np.load(path / VECTORS_FILE, mmap_mode="r").shape[0]
+
+    # =======================
+    # Search
+    # =======================
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        vectors, documents = self.vectors, self.documents
+        if not documents or k <= 0:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = vectors @ query
+
+        if filter:
+            allowed = np.fromiter(
+                (matches_filter(doc.metadata, filter) for doc in documents), dtype=bool, count=len(documents)
+            )
+            scores = np.where(allowed, scores, -np.inf)
+
+        k = min(k, len(documents))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(documents) else np.arange(len(documents))
+        top = top[np.argsort(-scores[top])]
+        return [(documents[i], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def score_documents(self, embedding: List[float], documents: List[Document]) -> List[Optional[float]]:
+        """
+        Cosine score of the query against chunks found elsewhere (e.g. the keyword index),
+        matched by (filename, chunk_no); None for chunks this index does not hold
+        """
+        vectors, indexed = self.vectors, self.documents
+        rows = {chunk_key(doc): i for i, doc in enumerate(indexed)}
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = []
+        for doc in documents:
+            row = rows.get(chunk_key(doc))
+            scores.append(float(vectors[row] @ query) if row is not None else None)
+        return scores
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] -> relevance in [0, 1]
+        return lambda score: (score + 1) / 2
@@ -0,0 +1,349 @@
+"""
+Generation Providers
+Interchangeable answer generators (Gemini key rotation, a CPU-local llama.cpp
+model, extractive fallback) tried in GENERATION_PROVIDERS order until one answers
+"""
+
+import os
+import re
+import time
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from context_builder import count_tokens, ANSWER_SENTENCES
+from llm_service import GEMINI_API_KEY_LIST, try_all_keys_for_genai_call, try_all_keys_for_genai_stream
+
+# =======================
+# Configuration
+# =======================
+# Comma-separated fallback order; unknown or unconfigured providers are skipped
+GENERATION_PROVIDERS = os.getenv("GENERATION_PROVIDERS", "gemini,local,extractive")
+
+# Local CPU model (optional: pip install llama-cpp-python, then point at a GGUF file)
+LOCAL_LLM_MODEL_PATH = os.getenv("LOCAL_LLM_MODEL_PATH", "")
+LOCAL_LLM_CONTEXT_TOKENS = int(os.getenv("LOCAL_LLM_CONTEXT_TOKENS", "2048"))
+LOCAL_LLM_THREADS = int(os.getenv("LOCAL_LLM_THREADS", str(os.cpu_count() or 4)))
+
+# Cost per 1K tokens (prompt + answer) for comparing providers: "gemini:0.0004,local:0"
+PROVIDER_COST_PER_1K_TOKENS = os.getenv("PROVIDER_COST_PER_1K_TOKENS", "")
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+WORD_PATTERN = re.compile(r"\w+")
+
+def parse_costs(spec: str) -> Dict[str, float]:
+    """Parse PROVIDER_COST_PER_1K_TOKENS into {provider: cost}"""
+    costs = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, cost = item.rsplit(":", 1)
+        costs[name.strip()] = float(cost)
+    return costs
+
+PROVIDER_COSTS = parse_costs(PROVIDER_COST_PER_1K_TOKENS)
+
+# =======================
+# Providers
+# =======================
+class GeminiProvider:
+    """Gemini through the health-ordered key rotation"""
+
+    name = "gemini"
+    cacheable = True
+
+    def is_available(self) -> bool:
+        return bool(GEMINI_API_KEY_LIST)
+
+    async def generate(
+        self,
+        q: str,
+        prompt: str,
+        docs: list,
+        generation_config: Optional[dict] = None,
+        model_name: Optional[str] = None
+    ) -> str:
+        return await try_all_keys_for_genai_call(prompt, generation_config=generation_config, model_name=model_name)
+
+    async def stream(
+        self,
+        q: str,
+        prompt: str,
+        docs: list,
+        generation_config: Optional[dict] = None,
+        model_name: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        async for chunk in try_all_keys_for_genai_stream(prompt, generation_config=generation_config, model_name=model_name):
+            yield chunk
+
+class LocalLlamaProvider:
+    """
+    GGUF model served in-process by llama.cpp on the CPU
+    The model is loaded on first use; calls are serialized because a llama.cpp context is not thread-safe
+    """
+
+    name = "local"
+    cacheable = True
+
+    def __init__(self, model_path: str = LOCAL_LLM_MODEL_PATH):
+        self.model_path = model_path
+        self._llm = None
+        self._lock = asyncio.Lock()
+
+    def is_available(self) -> bool:
+        return bool(self.model_path) and os.path.exists(self.model_path)
+
+    def _load(self):
+        if self._llm is None:
+            from llama_cpp import Llama  # optional dependency
+
+            print(f"🖥️ Loading local model {self.model_path} ({LOCAL_LLM_THREADS} threads)")
+            self._llm = Llama(
+                model_path=self.model_path,
+                n_ctx=LOCAL_LLM_CONTEXT_TOKENS,
+                n_threads=LOCAL_LLM_THREADS,
+                verbose=False
+            )
+        return self._llm
+
+    @staticmethod
+    def _options(generation_config: Optional[dict]) -> dict:
+        config = generation_config or {}
+        return {
+            "max_tokens": config.get("maxOutputTokens", 256),
+            "temperature": config.get("temperature", 0.3),
+        }
+
+    async def generate(
+        self,
+        q: str,
+        prompt: str,
+        docs: list,
+        generation_config: Optional[dict] = None,
+        model_name: Optional[str] = None
+    ) -> str:
+        async with self._lock:
+            llm = await asyncio.to_thread(self._load)
+            result = await asyncio.to_thread(llm, prompt, **self._options(generation_config))
+        return result["choices"][0]["text"].strip()
+
+    async def stream(
+        self,
+        q: str,
+        prompt: str,
+        docs: list,
+        generation_config: Optional[dict] = None,
+        model_name: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        async with self._lock:
+            llm = await asyncio.to_thread(self._load)
+            chunks = await asyncio.to_thread(llm, prompt, stream=True, **self._options(generation_config))
+            while True:
+                # Pull each token off the event loop
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                text = chunk["choices"][0]["text"]
+                if text:
+                    yield text
+
+class ExtractiveProvider:
+    """
+    Answers with the retrieved sentences that best match the question
+    No model call, so it keeps serving when every key is exhausted
+    """
+
+    name = "extractive"
+    cacheable = False  # lower quality; never pin it in the answer caches
+
+    def __init__(self, max_sentences: int = ANSWER_SENTENCES):
+        self.max_sentences = max_sentences
+
+    def is_available(self) -> bool:
+        return True
+
+    def extract(self, q: str, docs: list, require_overlap: bool = False) -> str:
+        """
+        Top sentences by question-word overlap, kept in document order
+        With require_overlap, sentences sharing no word with the question are dropped
+        """
+        question_words = {w for w in WORD_PATTERN.findall(q.lower()) if len(w) > 2}
+        sentences: List[Tuple[float, int, str]] = []
+        seen = set()
+
+        for rank, doc in enumerate(docs):
+            for sentence in SENTENCE_SPLIT.split(doc.page_content.strip()):
+                sentence = " ".join(sentence.split())
+                if len(sentence) < 20 or sentence in seen:
+                    continue
+                seen.add(sentence)
+                words = set(WORD_PATTERN.findall(sentence.lower()))
+                overlap = len(question_words & words)
+                if require_overlap and not overlap:
+                    continue
+                # Prefer higher-ranked docs when overlap ties
+                score = overlap - rank * 0.01
+                sentences.append((score, len(sentences), sentence))
+
+        best = sorted(sentences, key=lambda item: -item[0])[:self.max_sentences]
+        return " ".join(sentence for _, _, sentence in sorted(best, key=lambda item: item[1]))
+
+    async def generate(
+        self,
+        q: str,
+        prompt: str,
+        docs: list,
+        generation_config: Optional[dict] = None,
+        model_name: Optional[str] = None
+    ) -> str:
+        answer = self.extract(q, docs)
+        if not answer:
+            raise Exception("No extractable sentences in the retrieved documents")
+        return answer
+
+    async def stream(
+        self,
+        q: str,
+        prompt: str,
+        docs: list,
+        generation_config: Optional[dict] = None,
+        model_name: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        yield await self.generate(q, prompt, docs, generation_config, model_name)
+
+PROVIDER_CLASSES = {
+    "gemini": GeminiProvider,
+    "local": LocalLlamaProvider,
+    "extractive": ExtractiveProvider,
+}
+
+# =======================
+# Counters
+# =======================
+class ProviderStats:
+    """Per-provider call, latency, token and cost counters"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.prompt_tokens = 0
+        self.answer_tokens = 0
+        self.last_error: Optional[str] = None
+
+    def record_success(self, started: float, prompt: str, answer: str):
+        self.successes += 1
+        self.total_latency += time.monotonic() - started
+        self.prompt_tokens += count_tokens(prompt)
+        self.answer_tokens += count_tokens(answer)
+
+    def record_failure(self, error: Exception):
+        self.failures += 1
+        self.last_error = str(error)[:200]
+
+    def snapshot(self) -> dict:
+        cost_per_1k = PROVIDER_COSTS.get(self.name, 0.0)
+        tokens = self.prompt_tokens + self.answer_tokens
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "avg_latency_ms": round(self.total_latency / self.successes * 1000, 1) if self.successes else None,
+            "prompt_tokens": self.prompt_tokens,
+            "answer_tokens": self.answer_tokens,
+            "estimated_cost": round(tokens / 1000 * cost_per_1k, 6),
+            "last_error": self.last_error,
+        }
+
+# =======================
+# Provider Chain
+# =======================
+class ProviderChain:
+    """Ordered fallback across generation providers"""
+
+    def __init__(self, providers: list):
+        self.providers = providers
+        self.stats = {provider.name: ProviderStats(provider.name) for provider in providers}
+
+    def active_providers(self) -> list:
+        return [provider for provider in self.providers if provider.is_available()]
+
+    async def generate(
+        self,
+        q: str,
+        prompt: str,
+        docs: list,
+        generation_config: Optional[dict] = None,
+        model_name: Optional[str] = None
+    ) -> Tuple[str, object]:
+        """Return (answer, provider) from the first provider that answers"""
+        last_error = None
+        for provider in self.active_providers():
+            stats = self.stats[provider.name]
+            stats.calls += 1
+            started = time.monotonic()
+            try:
+                answer = await provider.generate(q, prompt, docs, generation_config, model_name)
+                stats.record_success(started, prompt, answer)
+                print(f"🧠 Answer generated by {provider.name}")
+                return answer, provider
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats.record_failure(e)
+                last_error = e
+                print(f"⚠️ Provider {provider.name} failed, falling back: {str(e)[:100]}")
+
+        raise Exception(f"All generation providers failed. Last error: {str(last_error)}")
+
+    async def stream(
+        self,
+        q: str,
+        prompt: str,
+        docs: list,
+        generation_config: Optional[dict] = None,
+        model_name: Optional[str] = None
+    ) -> AsyncIterator[Tuple[object, str]]:
+        """Yield (provider, chunk), falling back to the next provider until the first chunk arrives"""
+        last_error = None
+        for provider in self.active_providers():
+            stats = self.stats[provider.name]
+            stats.calls += 1
+            started = time.monotonic()
+            chunks = []
+            try:
+                async for chunk in provider.stream(q, prompt, docs, generation_config, model_name):
+                    chunks.append(chunk)
+                    yield provider, chunk
+                stats.record_success(started, prompt, "".join(chunks))
+                return
+            except (asyncio.CancelledError, GeneratorExit):
+                raise
+            except Exception as e:
+                stats.record_failure(e)
+                # Once tokens reached the client we cannot switch providers mid-answer
+                if chunks:
+                    raise
+                last_error = e
+                print(f"⚠️ Provider {provider.name} failed, falling back: {str(e)[:100]}")
+
+        raise Exception(f"All generation providers failed. Last error: {str(last_error)}")
+
+    def snapshot(self) -> dict:
+        """Counters for the /health endpoint"""
+        return {
+            "order": [provider.name for provider in self.providers],
+            "available": [provider.name for provider in self.active_providers()],
+            "providers": {name: stats.snapshot() for name, stats in self.stats.items()},
+        }
+
+def build_provider_chain(spec: str = GENERATION_PROVIDERS) -> ProviderChain:
+    """Create the providers named in GENERATION_PROVIDERS, in order"""
+    providers = []
+    for name in filter(None, (part.strip().lower() for part in spec.split(","))):
+        provider_class = PROVIDER_CLASSES.get(name)
+        if provider_class is None:
+            print(f"⚠️ Unknown generation provider '{name}' ignored")
+            continue
+        providers.append(provider_class())
+    print(f"🧠 Generation providers: {', '.join(p.name for p in providers) or 'none'}")
+    return ProviderChain(providers)
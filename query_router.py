@@ -0,0 +1,145 @@
+"""
+Query Router
+Cheap complexity classification ahead of generation: confident factual lookups
+go to the extractive path, short/simple questions to a lighter model with a
+smaller answer, everything else to the full model
+"""
+
+import os
+import re
+import time
+from typing import Optional
+
+from context_builder import answer_token_cap, ANSWER_SENTENCES
+from gemini_client import GEMINI_MODEL, DEFAULT_GENERATION_CONFIG
+from rag_utils import normalize_question
+
+# =======================
+# Configuration
+# =======================
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+
+# Extractive route: answer straight from the chunks when retrieval is this confident (cosine similarity)
+EXTRACTIVE_FAST_PATH_ENABLED = os.getenv("EXTRACTIVE_FAST_PATH_ENABLED", "true").lower() == "true"
+EXTRACTIVE_SCORE_THRESHOLD = float(os.getenv("EXTRACTIVE_SCORE_THRESHOLD", "0.8"))
+
+# Light route: faster model and shorter answers for simple questions
+ROUTER_LIGHT_MODEL = os.getenv("ROUTER_LIGHT_MODEL", "gemini-2.5-flash-lite")
+ROUTER_LIGHT_SENTENCES = int(os.getenv("ROUTER_LIGHT_SENTENCES", "2"))
+ROUTER_SIMPLE_MAX_WORDS = int(os.getenv("ROUTER_SIMPLE_MAX_WORDS", "8"))
+
+# Full route triggers
+ROUTER_COMPLEX_MIN_WORDS = int(os.getenv("ROUTER_COMPLEX_MIN_WORDS", "25"))
+# Top-vs-last score gap below this means the answer is spread over several chunks
+ROUTER_FLAT_SPREAD = float(os.getenv("ROUTER_FLAT_SPREAD", "0.05"))
+
+COMPLEX_KEYWORDS = (
+    "compare", "comparison", "difference", "differences", "versus", "vs",
+    "explain", "why", "how does", "how do", "pros", "cons", "tradeoff",
+    "trade off", "step by step", "walk me through", "in detail", "summarize", "summary",
+)
+COMPLEX_PATTERN = re.compile(r"\b(" + "|".join(re.escape(k) for k in COMPLEX_KEYWORDS) + r")\b")
+
+GREETINGS = {"hi", "hello", "hey", "thanks", "thank you", "good morning", "good evening", "bye"}
+
+ROUTES = ("extractive", "light", "full")
+
+# =======================
+# Route Metrics
+# =======================
+class RouteStats:
+    """Per-route request, latency and token counters"""
+
+    def __init__(self):
+        self.requests = 0
+        self.total_latency = 0.0
+        self.prompt_tokens = 0
+        self.answer_tokens = 0
+        self.reasons = {}
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "avg_latency_ms": round(self.total_latency / self.requests * 1000, 1) if self.requests else None,
+            "prompt_tokens": self.prompt_tokens,
+            "answer_tokens": self.answer_tokens,
+            "avg_answer_tokens": round(self.answer_tokens / self.requests, 1) if self.requests else None,
+            "reasons": dict(self.reasons),
+        }
+
+# =======================
+# Router
+# =======================
+class QueryRouter:
+    """Classifies questions into extractive / light / full routes"""
+
+    def __init__(self):
+        self.stats = {route: RouteStats() for route in ROUTES}
+        self.extractive_misses = 0
+
+    def classify(self, q: str, scores: Optional[list] = None, allow_extractive: bool = True) -> tuple:
+        """Return (route, reason) from question length, keywords and retrieval score spread"""
+        normalized = normalize_question(q)
+        words = len(normalized.split())
+        # Keyword-only hits carry no cosine score
+        scores = [score for score in (scores or []) if score is not None]
+
+        if COMPLEX_PATTERN.search(normalized):
+            return "full", "keyword"
+        if words >= ROUTER_COMPLEX_MIN_WORDS:
+            return "full", "long_question"
+        if q.count("?") > 1:
+            return "full", "multi_part"
+
+        if allow_extractive and EXTRACTIVE_FAST_PATH_ENABLED and scores and scores[0] >= EXTRACTIVE_SCORE_THRESHOLD:
+            return "extractive", "confident_retrieval"
+
+        if not ROUTER_ENABLED:
+            return "full", "router_disabled"
+        if len(scores) >= 3 and scores[0] - scores[-1] < ROUTER_FLAT_SPREAD:
+            return "full", "flat_scores"
+        if normalized in GREETINGS:
+            return "light", "greeting"
+        if words <= ROUTER_SIMPLE_MAX_WORDS:
+            return "light", "short_question"
+        return "full", "default"
+
+    def generation_settings(self, route: str) -> dict:
+        """Model, generation config and answer length for a generation route"""
+        if route == "light" and ROUTER_LIGHT_MODEL:
+            return {
+                "model_name": ROUTER_LIGHT_MODEL,
+                "sentences": ROUTER_LIGHT_SENTENCES,
+                "generation_config": {
+                    **DEFAULT_GENERATION_CONFIG,
+                    "maxOutputTokens": answer_token_cap(ROUTER_LIGHT_SENTENCES),
+                },
+            }
+        return {
+            "model_name": GEMINI_MODEL,
+            "sentences": ANSWER_SENTENCES,
+            "generation_config": {
+                **DEFAULT_GENERATION_CONFIG,
+                "maxOutputTokens": answer_token_cap(ANSWER_SENTENCES),
+            },
+        }
+
+    def record(self, route: str, reason: str, started: float, prompt_tokens: int = 0, answer_tokens: int = 0):
+        """Record one routed request"""
+        stats = self.stats[route]
+        stats.requests += 1
+        stats.total_latency += time.monotonic() - started
+        stats.prompt_tokens += prompt_tokens
+        stats.answer_tokens += answer_tokens
+        stats.reasons[reason] = stats.reasons.get(reason, 0) + 1
+
+    def snapshot(self) -> dict:
+        """Counters for the /health endpoint"""
+        return {
+            "enabled": ROUTER_ENABLED,
+            "light_model": ROUTER_LIGHT_MODEL,
+            "full_model": GEMINI_MODEL,
+            "extractive_threshold": EXTRACTIVE_SCORE_THRESHOLD,
+            "extractive_misses": self.extractive_misses,
+            "routes": {route: stats.snapshot() for route, stats in self.stats.items()},
+        }
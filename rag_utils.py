@@ -2,7 +2,8 @@
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_huggingface import HuggingFaceEmbeddings
+from embedding_backends import build_embeddings
+from corpus_metadata import file_metadata
 from langchain_qdrant import QdrantVectorStore
 # # from langchain_pinecone import PineconeVectorStore
 # from langchain_community.vectorstores import Pinecone
@@ -11,7 +12,13 @@ from pathlib import Path
 import re
 
 def get_embedding_model():
-    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    # EMBEDDING_BACKEND picks PyTorch (default) or the quantized ONNX export
+    return build_embeddings()
+
+def normalize_question(q: str) -> str:
+    """Fold case, punctuation and whitespace so trivially different questions match"""
+    q = re.sub(r'[^\w\s]', ' ', q.lower())
+    return re.sub(r'\s+', ' ', q).strip()
 
 def load_md_to_chunks(md_path: str):
     """Load a Markdown file and split it into chunks."""
@@ -34,7 +41,8 @@ def load_md_to_chunks(md_path: str):
         metadata = {
             "source": "kashaf_profile",
             "chunk_no": i + 1,
-            "filename": Path(md_path).name
+            "filename": Path(md_path).name,
+            **file_metadata(Path(md_path).name)  # category / topic / tags for filtered retrieval
         }
         doc_list.append(Document(page_content=chunk, metadata=metadata))
     
@@ -0,0 +1,164 @@
+"""
+Quota-Aware Request Pacing
+Per-key token buckets for requests-per-minute and tokens-per-minute so calls are
+scheduled onto keys with spare capacity instead of burning retries on exhausted ones
+"""
+
+import os
+import time
+import asyncio
+from typing import Callable, List, Optional
+
+# =======================
+# Configuration
+# =======================
+GEMINI_KEY_RPM = float(os.getenv("GEMINI_KEY_RPM", "10"))
+GEMINI_KEY_TPM = float(os.getenv("GEMINI_KEY_TPM", "250000"))
+PACER_MAX_WAIT_SECONDS = float(os.getenv("PACER_MAX_WAIT_SECONDS", "5"))
+
+# Rough chars-per-token ratio for English prompts
+CHARS_PER_TOKEN = 4
+
+# =======================
+# Helper Functions
+# =======================
+def estimate_tokens(prompt: str, max_output_tokens: int) -> int:
+    """Estimate tokens charged for a call (prompt plus the output cap)"""
+    return len(prompt) // CHARS_PER_TOKEN + max_output_tokens
+
+# =======================
+# Token Bucket
+# =======================
+class TokenBucket:
+    """Classic token bucket refilled continuously at capacity-per-minute"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        """Add the tokens accrued since the last update"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available"""
+        self.refill(now)
+        # Requests larger than the bucket only need a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        """Take tokens from the bucket"""
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self, now: float):
+        """Mark the bucket as exhausted (e.g. after a 429)"""
+        self.refill(now)
+        self.tokens = 0.0
+
+# =======================
+# Key Pacer
+# =======================
+class KeyPacer:
+    """RPM / TPM buckets per key client with a short queue when every key is busy"""
+
+    def __init__(
+        self,
+        key_clients: list,
+        rpm: float = GEMINI_KEY_RPM,
+        tpm: float = GEMINI_KEY_TPM,
+        max_wait: float = PACER_MAX_WAIT_SECONDS
+    ):
+        self.max_wait = max_wait
+        self.buckets = {
+            id(kc): {"rpm": TokenBucket(rpm), "tpm": TokenBucket(tpm)}
+            for kc in key_clients
+        }
+        self.key_clients = list(key_clients)
+        self.granted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+
+    def wait_time(self, key_client, tokens: int, now: float) -> float:
+        """Seconds until the key has capacity for one request of `tokens`"""
+        buckets = self.buckets[id(key_client)]
+        return max(buckets["rpm"].wait_time(1, now), buckets["tpm"].wait_time(tokens, now))
+
+    def try_acquire(self, key_client, tokens: int) -> bool:
+        """Reserve capacity on the key if it is available right now"""
+        if self.wait_time(key_client, tokens, time.monotonic()) > 0:
+            return False
+        buckets = self.buckets[id(key_client)]
+        buckets["rpm"].consume(1)
+        buckets["tpm"].consume(tokens)
+        return True
+
+    async def acquire(
+        self,
+        candidates: List,
+        tokens: int,
+        is_available: Optional[Callable[[object], bool]] = None
+    ) -> Optional[object]:
+        """
+        Pick the first candidate (in preference order) with capacity
+        Keys failing is_available (open circuits) are skipped while any other candidate
+        remains, so a busy healthy key is waited for rather than falling through to a broken one.
+        Waits up to max_wait for capacity; returns None if none frees up
+        """
+        if not candidates:
+            return None
+
+        waited = 0.0
+        while True:
+            # Re-checked every round: circuits close while we wait
+            pool = [kc for kc in candidates if is_available(kc)] if is_available else candidates
+            pool = pool or candidates
+            for key_client in pool:
+                if self.try_acquire(key_client, tokens):
+                    self.granted += 1
+                    if waited:
+                        self.total_wait += waited
+                    return key_client
+
+            now = time.monotonic()
+            delay = min(self.wait_time(kc, tokens, now) for kc in pool)
+            if waited + delay > self.max_wait:
+                self.rejected += 1
+                return None
+
+            if not waited:
+                self.queued += 1
+            print(f"⏳ All keys at capacity, queueing for {delay:.2f}s")
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def mark_exhausted(self, key_client):
+        """Drain the key's request bucket after the API reported a rate limit"""
+        self.buckets[id(key_client)]["rpm"].drain(time.monotonic())
+
+    def snapshot(self) -> dict:
+        """Pacer state for the /health endpoint"""
+        now = time.monotonic()
+        keys = []
+        for i, kc in enumerate(self.key_clients):
+            buckets = self.buckets[id(kc)]
+            buckets["rpm"].refill(now)
+            buckets["tpm"].refill(now)
+            keys.append({
+                "key": f"key_{i + 1}",
+                "requests_available": round(buckets["rpm"].tokens, 2),
+                "tokens_available": int(buckets["tpm"].tokens),
+            })
+        return {
+            "granted": self.granted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "avg_queue_wait_s": round(self.total_wait / self.queued, 3) if self.queued else 0.0,
+            "keys": keys,
+        }
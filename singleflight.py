@@ -0,0 +1,46 @@
+"""
+Single-Flight Request Coalescing
+Concurrent callers asking for the same key share one in-flight execution
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    """Runs at most one coroutine per key at a time and fans its result out to every waiter"""
+
+    def __init__(self):
+        self.in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        """Run fn() for the key, or join the execution already in flight"""
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            # Shield so one waiter disconnecting does not cancel the shared work
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(fn())
+        self.in_flight[key] = task
+        self.executed += 1
+
+        def _done(finished: asyncio.Future):
+            if self.in_flight.get(key) is finished:
+                del self.in_flight[key]
+            if not finished.cancelled():
+                finished.exception()  # mark retrieved even if every waiter went away
+
+        task.add_done_callback(_done)
+        return await asyncio.shield(task)
+
+    def snapshot(self) -> dict:
+        """Counters for the /health endpoint"""
+        total = self.executed + self.coalesced
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesce_rate": round(self.coalesced / total, 3) if total else 0.0,
+            "in_flight": len(self.in_flight),
+        }
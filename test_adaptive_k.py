@@ -0,0 +1,65 @@
+# test_adaptive_k.py
+# Adaptive k must trim hybrid results too, including keyword-only hits without a cosine score
+import pytest
+
+import adaptive_k
+from adaptive_k import select_chunks, clamp_k
+
+
+@pytest.fixture(autouse=True)
+def adaptive_settings(monkeypatch):
+    monkeypatch.setattr(adaptive_k, "ADAPTIVE_K_ENABLED", True)
+    monkeypatch.setattr(adaptive_k, "RETRIEVAL_MAX_K", 6)
+    monkeypatch.setattr(adaptive_k, "RETRIEVAL_MIN_SCORE", 0.35)
+    monkeypatch.setattr(adaptive_k, "RETRIEVAL_SCORE_GAP", 0.1)
+
+
+def test_unscored_keyword_hits_do_not_pad_weak_results():
+    docs, scores = select_chunks(list("ABCDEF"), [0.31, None, None, None, None, None], 1)
+    assert docs == ["A"]
+    assert scores == [0.31]
+
+
+def test_mixed_scores_stop_at_first_unscored_hit_after_min_k():
+    docs, _ = select_chunks(list("ABCDEF"), [0.8, 0.78, None, 0.75, 0.74, 0.7], 1)
+    assert docs == ["A", "B"]
+
+
+def test_unscored_top_hit_is_kept_as_the_minimum():
+    docs, scores = select_chunks(list("ABCD"), [None, 0.9, 0.88, 0.2], 1)
+    assert docs == ["A", "B", "C"]
+    assert scores == [None, 0.9, 0.88]
+
+
+def test_min_k_keeps_unscored_hits():
+    docs, _ = select_chunks(list("ABCD"), [0.8, None, None, 0.2], 3)
+    assert docs == ["A", "B", "C"]
+
+
+def test_cutoff_and_gap_on_dense_scores():
+    assert select_chunks(list("ABCDEFGH"), [0.8, 0.75, 0.7, 0.5, 0.45, 0.4, 0.3, 0.2], 1)[0] == ["A", "B", "C"]
+    assert select_chunks(list("ABC"), [0.6, 0.3, 0.29], 1)[0] == ["A"]
+    assert len(select_chunks(list("ABCDEFGH"), [0.9] * 8, 1)[0]) == 6
+
+
+def test_clamp_k():
+    assert clamp_k("50") == 6
+    assert clamp_k(0) == 1
+    assert clamp_k("x") == 1
+
+
+def test_numpy_store_scores_keyword_only_hits():
+    pytest.importorskip("langchain_core")
+    import numpy as np
+    from langchain_core.documents import Document
+    from numpy_store import NumpyVectorStore
+
+    indexed = [Document(page_content=t, metadata={"filename": "f.md", "chunk_no": i}) for i, t in enumerate("abc")]
+    store = NumpyVectorStore(None, np.eye(3, dtype=np.float32), indexed)
+    keyword_hits = [
+        Document(page_content="c", metadata={"filename": "f.md", "chunk_no": 2}),
+        Document(page_content="?", metadata={"filename": "other.md", "chunk_no": 0}),
+    ]
+    scores = store.score_documents([0.0, 0.6, 0.8], keyword_hits)
+    assert scores[0] == pytest.approx(0.8)
+    assert scores[1] is None
@@ -0,0 +1,73 @@
+# test_embedding_batcher.py
+# Regression: a cancelled aembed_query must not stop the batcher worker
+import time
+import asyncio
+import threading
+
+from embedding_batcher import EmbeddingBatcher
+
+
+class SlowModel:
+    """Stub model: one vector per text, slow enough to cancel a caller mid-batch"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.release = threading.Event()
+
+    def embed_documents(self, texts):
+        self.release.wait(timeout=1)
+        time.sleep(self.delay)
+        return [[float(len(text))] for text in texts]
+
+
+def test_cancelled_query_does_not_kill_worker():
+    model = SlowModel()
+    batcher = EmbeddingBatcher(model, max_batch_size=8, max_wait_ms=1)
+
+    async def scenario():
+        # Cancelled while its batch is in the model: worker sets the result on a cancelled asyncio side
+        in_flight = asyncio.ensure_future(batcher.aembed_query("in flight"))
+        await asyncio.sleep(0.01)
+        in_flight.cancel()
+        model.release.set()
+
+        # Cancelled while still queued: the worker must drop it
+        model.release.clear()
+        blocker = asyncio.ensure_future(batcher.aembed_query("blocker"))
+        await asyncio.sleep(0.01)
+        queued = asyncio.ensure_future(batcher.aembed_query("queued"))
+        await asyncio.sleep(0)
+        queued.cancel()
+        model.release.set()
+        await blocker
+
+        return await asyncio.wait_for(batcher.aembed_query("next"), timeout=2)
+
+    assert asyncio.run(scenario()) == [4.0]
+    assert batcher._worker.is_alive()
+    assert batcher.embed_query("sync") == [4.0]
+
+
+def test_model_error_reaches_caller_and_worker_survives():
+    class FlakyModel:
+        calls = 0
+
+        def embed_documents(self, texts):
+            FlakyModel.calls += 1
+            if FlakyModel.calls == 1:
+                raise RuntimeError("boom")
+            return [[1.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(FlakyModel(), max_wait_ms=1)
+    try:
+        batcher.embed_query("first")
+        raise AssertionError("expected the model error")
+    except RuntimeError:
+        pass
+    assert batcher.embed_query("second") == [1.0]
+
+
+if __name__ == "__main__":
+    test_cancelled_query_does_not_kill_worker()
+    test_model_error_reaches_caller_and_worker_survives()
+    print("✅ Embedding batcher survives cancelled requests")
@@ -0,0 +1,37 @@
+# test_embedding_parity.py
+# The int8 ONNX backend must rank the knowledge base like the PyTorch model (skipped without onnxruntime)
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("transformers")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("langchain_huggingface")
+
+from bench_embeddings import SAMPLE_QUESTIONS, corpus_texts, parity_report
+from embedding_backends import OnnxEmbeddings, build_embeddings
+
+MIN_COSINE = 0.98
+
+
+@pytest.fixture(scope="module")
+def report():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(Path(__file__).parent)  # corpus_texts() reads data/ from the working directory
+        texts = corpus_texts()
+    return parity_report(
+        build_embeddings("torch").embed_documents(texts),
+        OnnxEmbeddings(quantized=True).embed_documents(texts),
+    )
+
+
+def test_int8_vectors_match_torch(report):
+    assert report["cosine"].min() >= MIN_COSINE
+
+
+def test_int8_retrieves_same_top_chunk(report):
+    disagree = [
+        q for q, a, b in zip(SAMPLE_QUESTIONS, report["top_torch"], report["top_onnx"]) if a != b
+    ]
+    assert not disagree, f"int8 ONNX changes the top chunk for: {disagree}"
@@ -0,0 +1,122 @@
+# test_key_rotation.py
+# Key scheduler + pacer + hedging: a busy healthy key is waited for, never skipped for a broken one
+import time
+import asyncio
+
+import llm_service
+from gemini_client import GeminiAPIError
+from key_scheduler import KeyScheduler
+from rate_limiter import KeyPacer
+from hedging import HedgeStats, hedged_call
+
+
+class FakeKeyClient:
+    """Stub key client: answers after `delay` seconds, or raises `error`"""
+
+    def __init__(self, key_id: str, delay: float = 0.0, error: Exception = None):
+        self.key_id = key_id
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def generate_content(self, prompt, generation_config=None, model_name=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return f"answer from {self.key_id}"
+
+
+def use_keys(monkeypatch, clients, rpm=600.0, max_wait=2.0):
+    """Point llm_service at fresh scheduler / pacer state for the given clients"""
+    scheduler = KeyScheduler(clients)
+    pacer = KeyPacer(clients, rpm=rpm, max_wait=max_wait)
+    monkeypatch.setattr(llm_service, "KEY_SCHEDULER", scheduler)
+    monkeypatch.setattr(llm_service, "KEY_PACER", pacer)
+    monkeypatch.setattr(llm_service, "GEMINI_API_KEY_LIST", [c.key_id for c in clients])
+    monkeypatch.setattr(llm_service, "HEDGE_REQUESTS", False)
+    return scheduler, pacer
+
+
+def empty_bucket(pacer, key_client):
+    pacer.buckets[id(key_client)]["rpm"].drain(time.monotonic())
+
+
+def test_pacer_waits_for_healthy_key_instead_of_open_circuit(monkeypatch):
+    healthy = FakeKeyClient("key_healthy")
+    revoked = FakeKeyClient("key_revoked", error=GeminiAPIError("revoked", status_code=403))
+    scheduler, pacer = use_keys(monkeypatch, [healthy, revoked])
+
+    scheduler.record_failure(revoked, revoked.error)  # circuit open for the max cooldown
+    assert not scheduler.is_available(revoked)
+    empty_bucket(pacer, healthy)  # healthy key just hit its RPM limit
+
+    answer = asyncio.run(llm_service.try_all_keys_for_genai_call("question"))
+
+    assert answer == "answer from key_healthy"
+    assert revoked.calls == 0
+    assert pacer.queued == 1
+
+
+def test_open_circuit_key_used_when_no_closed_key_remains(monkeypatch):
+    only = FakeKeyClient("key_only")
+    scheduler, pacer = use_keys(monkeypatch, [only])
+    scheduler.record_failure(only, GeminiAPIError("slow down", status_code=429))
+
+    granted = asyncio.run(pacer.acquire([only], 10, scheduler.is_available))
+    assert granted is only
+
+
+def test_failover_after_error_and_rate_limit_drain(monkeypatch):
+    failing = FakeKeyClient("key_failing", error=GeminiAPIError("quota", status_code=429))
+    backup = FakeKeyClient("key_backup")
+    scheduler, pacer = use_keys(monkeypatch, [failing, backup])
+
+    answer = asyncio.run(llm_service.try_all_keys_for_genai_call("question"))
+
+    assert answer == "answer from key_backup"
+    assert not scheduler.is_available(failing)
+    assert pacer.buckets[id(failing)]["rpm"].tokens < 1
+
+
+def test_hedge_wins_and_slow_primary_is_cancelled():
+    stats = HedgeStats()
+    cancelled = asyncio.Event()
+
+    async def slow_primary():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "primary"
+
+    async def fast_hedge():
+        await asyncio.sleep(0.01)
+        return "hedge"
+
+    async def scenario():
+        result = await hedged_call(slow_primary, fast_hedge, 0.05, stats)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == "hedge"
+    assert cancelled.is_set()
+    assert stats.hedged == 1 and stats.hedge_wins == 1
+
+
+def test_hedge_skips_open_circuit_backup(monkeypatch):
+    primary = FakeKeyClient("key_primary", delay=0.1)
+    broken = FakeKeyClient("key_broken")
+    scheduler, pacer = use_keys(monkeypatch, [primary, broken])
+    stats = HedgeStats()
+    monkeypatch.setattr(llm_service, "HEDGE_STATS", stats)
+    scheduler.record_failure(broken, GeminiAPIError("revoked", status_code=403))
+    for _ in range(20):
+        scheduler.recent_latencies.append(0.01)  # enough samples to hedge after ~10ms
+
+    answer = asyncio.run(llm_service.hedged_key_call(primary, [broken], 10, "question"))
+
+    assert answer == "answer from key_primary"
+    assert broken.calls == 0
+    assert stats.requests == 1 and stats.hedged == 0